@@ -0,0 +1,168 @@
+import hashlib
+import io
+import os
+import tempfile
+import time
+
+from compression import SUFFIXES, compressor, decompressor, resolve_codec
+
+CHUNK_SIZE = 1024 * 1024  # Bytes leídos/escritos por bloque
+
+
+class ArtifactIntegrityError(ValueError):
+    """El contenido guardado no coincide con su hash (archivo dañado o modificado)."""
+
+
+class ArtifactStore:
+    """Archivos (ZIP de análisis, PDF de informes) guardados por contenido.
+
+    Cada archivo vive en ``root/<2 primeros caracteres del hash>/<sha256>``, así
+    que el mismo contenido se guarda una sola vez. La base sólo guarda el hash
+    y el tamaño.
+
+    Con ``codec`` los archivos se guardan comprimidos y la extensión indica
+    cómo (``<sha256>.zz``, ``.xz``, ``.zst``). El hash y el tamaño son siempre
+    los del contenido original, así que cambiar la compresión no invalida
+    las referencias de la base.
+    """
+
+    def __init__(self, root, codec="none", level=None):
+        self.root = root
+        self.codec = resolve_codec(codec)
+        self.level = level
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest, codec="none"):
+        return os.path.join(self.root, digest[:2], digest + SUFFIXES[codec])
+
+    def _find(self, digest):
+        """``(ruta, codec)`` del archivo guardado o None."""
+        for codec in SUFFIXES:
+            path = self.path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None
+
+    def exists(self, digest):
+        return self._find(digest) is not None
+
+    def put_file(self, source, codec=None):
+        """Guarda el contenido de un archivo binario abierto y devuelve ``(sha256, tamaño)``.
+
+        ``codec`` reemplaza la compresión del almacén (p. ej. "none" para un ZIP
+        que ya viene comprimido).
+        """
+        codec = self.codec if codec is None else resolve_codec(codec)
+        packer = compressor(codec, self.level)
+        sha = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sha.update(chunk)
+                    temp.write(packer.compress(chunk))
+                    size += len(chunk)
+                temp.write(packer.flush())
+            digest = sha.hexdigest()
+            found = self._find(digest)
+            if found:
+                # Mismo contenido ya guardado: se reutiliza y se marca como recién
+                # guardado para que una limpieza en curso no lo borre
+                os.remove(temp_path)
+                os.utime(found[0])
+            else:
+                final_path = self.path(digest, codec)
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(temp_path, final_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return digest, size
+
+    def put_bytes(self, data):
+        return self.put_file(io.BytesIO(data))
+
+    def copy_to(self, digest, destination):
+        """Copia el archivo a ``destination`` (ruta o archivo abierto) verificando su hash.
+
+        Devuelve los bytes copiados. Si el contenido no coincide con el hash se
+        lanza ArtifactIntegrityError (y se borra el archivo de destino si es una ruta).
+        """
+        if isinstance(destination, (str, os.PathLike)):
+            try:
+                with open(destination, "wb") as f:
+                    return self.copy_to(digest, f)
+            except ArtifactIntegrityError:
+                os.remove(destination)
+                raise
+        found = self._find(digest)
+        if found is None:
+            raise FileNotFoundError(f"No existe el archivo {digest[:12]}…")
+        path, codec = found
+        unpacker = decompressor(codec)
+        sha = hashlib.sha256()
+        copied = 0
+        with open(path, "rb") as source:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                try:
+                    chunk = unpacker.decompress(chunk)
+                except Exception as ex:
+                    raise ArtifactIntegrityError(f"El archivo {digest[:12]}… está dañado") from ex
+                sha.update(chunk)
+                destination.write(chunk)
+                copied += len(chunk)
+        if sha.hexdigest() != digest:
+            raise ArtifactIntegrityError(f"El archivo {digest[:12]}… está dañado")
+        return copied
+
+    def read_bytes(self, digest):
+        buffer = io.BytesIO()
+        self.copy_to(digest, buffer)
+        return buffer.getvalue()
+
+    def verify(self, digest):
+        """True si el archivo existe y su contenido coincide con el hash."""
+        try:
+            self.copy_to(digest, _NullWriter())
+        except (OSError, ArtifactIntegrityError):
+            return False
+        return True
+
+    def age(self, digest):
+        """Segundos desde que se guardó (o reutilizó) el archivo, o None si no existe."""
+        found = self._find(digest)
+        if found is None:
+            return None
+        try:
+            return time.time() - os.path.getmtime(found[0])
+        except FileNotFoundError:
+            return None
+
+    def delete(self, digest):
+        for codec in SUFFIXES:
+            try:
+                os.remove(self.path(digest, codec))
+            except FileNotFoundError:
+                pass
+
+    def digests(self):
+        """Hashes de todos los archivos guardados."""
+        for prefix in os.listdir(self.root):
+            folder = os.path.join(self.root, prefix)
+            if os.path.isdir(folder):
+                for name in os.listdir(folder):
+                    if not name.endswith(".tmp"):
+                        yield name.split(".", 1)[0]
+
+
+class _NullWriter:
+    def write(self, chunk):
+        return len(chunk)
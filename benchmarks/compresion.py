@@ -0,0 +1,108 @@
+"""Tamaño y tiempo de escritura del ZIP de un análisis típico (40 PNG) según la compresión.
+
+Uso (desde la raíz del proyecto): python -m benchmarks.compresion [repeticiones]
+También mide la compresión del almacén de artefactos con un PDF de esas imágenes.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from zipfile import ZipFile
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from artifact_store import ArtifactStore
+from compression import available_codecs, zip_options
+
+NIVELES = {"none": [None], "deflate": [1, 6, 9], "lzma": [None], "zstd": [3, 9, 19]}
+
+
+def imagenes_tipicas(cantidad=40):
+    """Mitad gráficos de barras y mitad tablas, como los que genera un análisis."""
+    rng = np.random.default_rng(0)
+    imagenes = {}
+    for i in range(cantidad // 2):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.bar([f"Cat {j}" for j in range(12)], rng.integers(10, 500, 12), color="#4CAF50")
+        ax.set_title(f"Gráfico {i}")
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=100, bbox_inches="tight")
+        plt.close(fig)
+        imagenes[f"graficos/grafico_{i}.png"] = buffer.getvalue()
+
+        fig, ax = plt.subplots(figsize=(14, 6))
+        ax.axis("off")
+        celdas = rng.integers(0, 10_000, (10, 6)).astype(str)
+        ax.table(cellText=celdas, colLabels=[f"Columna {j}" for j in range(6)], loc="center")
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight")
+        plt.close(fig)
+        imagenes[f"tablas/tabla_{i}.png"] = buffer.getvalue()
+    return imagenes
+
+
+def pdf_tipico(imagenes):
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    for png in imagenes.values():
+        c.drawImage(ImageReader(io.BytesIO(png)), 50, 200, width=500, height=300)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def escribir_zip(imagenes, opciones):
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w", **opciones) as zip_file:
+        for nombre, png in imagenes.items():
+            zip_file.writestr(nombre, png)
+    return buffer.getbuffer().nbytes
+
+
+def guardar_en_almacen(store, contenido):
+    digest, _ = store.put_bytes(contenido)
+    tamano = sum(os.path.getsize(os.path.join(carpeta, nombre))
+                 for carpeta, _, nombres in os.walk(store.root) for nombre in nombres)
+    store.delete(digest)
+    return tamano
+
+
+def main(repeticiones=5):
+    imagenes = imagenes_tipicas()
+    original = sum(len(png) for png in imagenes.values())
+    print(f"{len(imagenes)} PNG, {original / 1024:,.0f} KB sin comprimir")
+
+    print("\nZIP del análisis")
+    for codec in available_codecs():
+        for nivel in NIVELES[codec]:
+            tamano, ms = medir(lambda: escribir_zip(imagenes, zip_options(codec, nivel)), repeticiones)
+            etiqueta = codec if nivel is None else f"{codec} {nivel}"
+            print(f"{etiqueta:<12} {tamano / 1024:9,.0f} KB ({tamano / original:6.1%}) {ms:8.1f} ms")
+
+    pdf = pdf_tipico(imagenes)
+    print(f"\nInforme PDF en el almacén ({len(pdf) / 1024:,.0f} KB)")
+    with tempfile.TemporaryDirectory() as directorio:
+        for codec in available_codecs():
+            for nivel in NIVELES[codec]:
+                store = ArtifactStore(directorio, codec=codec, level=nivel)
+                tamano, ms = medir(lambda: guardar_en_almacen(store, pdf), repeticiones)
+                etiqueta = codec if nivel is None else f"{codec} {nivel}"
+                print(f"{etiqueta:<12} {tamano / 1024:9,.0f} KB ({tamano / len(pdf):6.1%}) {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
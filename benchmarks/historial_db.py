@@ -0,0 +1,84 @@
+"""Latencia de la lista del historial con y sin el índice (usuario_id, date).
+
+Uso (desde la raíz del proyecto): python -m benchmarks.historial_db [filas] [usuarios]
+Crea una base temporal; no toca app_data.db.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from database import DatabaseManager
+
+
+def poblar(db, filas, usuarios):
+    random.seed(0)
+    with db.connection:
+        db.connection.executemany(
+            "INSERT INTO usuarios (username, password_hash, email, fecha_registro) VALUES (?, 'x', NULL, '2024-01-01')",
+            ((f"usuario{i}",) for i in range(usuarios))
+        )
+        db.connection.executemany(
+            "INSERT INTO analyses (usuario_id, name, date, file_content, artifact_hash, artifact_size) "
+            "VALUES (?, ?, ?, x'', ?, ?)",
+            ((random.randint(1, usuarios), f"Analisis_{i}",
+              f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d} {random.randint(0, 23):02d}:00:00",
+              f"{i:064x}", random.randint(1, 30) * 1024 * 1024)
+             for i in range(filas))
+        )
+
+
+def medir(funcion, repeticiones=200):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def sentencias(db, funcion):
+    """SELECT que ejecuta ``funcion``, con los parámetros ya sustituidos."""
+    ejecutadas = []
+    db.connection.set_trace_callback(ejecutadas.append)
+    try:
+        funcion()
+    finally:
+        db.connection.set_trace_callback(None)
+    return [sql for sql in ejecutadas if sql.lstrip().upper().startswith("SELECT")]
+
+
+def main(filas=100_000, usuarios=100):
+    directorio = tempfile.mkdtemp()
+    os.chdir(directorio)  # app_data.db y artifacts/ se crean en el directorio temporal
+    db = DatabaseManager()
+    poblar(db, filas, usuarios)
+    print(f"{filas:,} análisis de {usuarios} usuarios")
+
+    consultas = {
+        "primera página (20)": lambda: db.fetch_analyses_metadata(usuarios // 2, limit=20),
+        "página 10 (20)": lambda: db.fetch_analyses_metadata(usuarios // 2, limit=20, offset=180),
+        "conteo": lambda: db.count_analyses_by_user(usuarios // 2),
+    }
+
+    resultados = {}
+    for etiqueta, indice in (("sin índice", False), ("con índice", True)):
+        with db.connection:
+            if indice:
+                db.create_user_date_indexes()
+            else:
+                db.connection.execute("DROP INDEX IF EXISTS idx_analyses_usuario_date")
+        db.connection.execute("ANALYZE")
+        for nombre, consulta in consultas.items():
+            # Plan de la misma consulta que se mide, tal como la ejecuta DatabaseManager
+            for sql in sentencias(db, consulta):
+                detalle = db.connection.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+                print(f"[{etiqueta}] {nombre}: {' | '.join(fila[-1] for fila in detalle)}")
+            resultados[(etiqueta, nombre)] = medir(consulta)
+
+    for nombre in consultas:
+        sin, con = resultados[("sin índice", nombre)], resultados[("con índice", nombre)]
+        print(f"{nombre:<22} sin índice: {sin:7.3f} ms | con índice: {con:7.3f} ms | {sin / con:,.0f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,152 @@
+"""Costo de crear la figura de cada gráfico: pyplot, Figure nueva, figura vaciada
+con clear() o ejes estilados reutilizados (lo que hace renderizar_grafico).
+
+Uso (desde la raíz del proyecto): python -m benchmarks.plantillas_graficos [repeticiones]
+Mide por separado el andamiaje (crear la figura y soltarla o vaciarla) y el
+gráfico completo con savefig, sobre gráficos de barras como los de los análisis,
+y verifica que cada variante dé el mismo PNG que una figura nueva.
+"""
+import io
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from scripts.render_graficos import ESTILO, nueva_figura, vaciar_figura
+
+FIGSIZES = [(12, 6), (14, 7), (10, 6), (12, 8)]
+
+
+def graficos_tipicos(cantidad=40, seed=0):
+    """Barras con etiquetas de valor y tight_layout, como las de los cuatro análisis.
+
+    Las categorías cambian de un gráfico a otro, como entre hospitales o años.
+    """
+    rng = np.random.default_rng(seed)
+    return [(FIGSIZES[i % len(FIGSIZES)], [f"Categoría {j + i % 3}" for j in range(12)], rng.integers(10, 5000, 12))
+            for i in range(cantidad)]
+
+
+def dibujar(fig, ax, etiquetas, valores):
+    barras = ax.bar(etiquetas, valores, color="#4CAF50")
+    for barra in barras:
+        ax.text(barra.get_x() + barra.get_width() / 2, barra.get_height(), f"{int(barra.get_height()):,}",
+                ha="center", va="bottom", fontsize=9)
+    ax.set_title("Egresos por categoría", fontsize=14)
+    ax.grid(True, axis="y", linestyle="--", alpha=0.3)
+    for spine in ["top", "right"]:
+        ax.spines[spine].set_visible(False)
+    ax.tick_params(axis="x", rotation=45)
+    fig.tight_layout()
+
+
+class Pyplot:
+    def tomar(self, figsize):
+        return plt.subplots(figsize=figsize)
+
+    def soltar(self, figsize, fig):
+        plt.close(fig)
+
+
+class FiguraNueva:
+    def tomar(self, figsize):
+        fig = nueva_figura(figsize)
+        return fig, fig.add_subplot()
+
+    def soltar(self, figsize, fig):
+        pass
+
+
+class FiguraVaciada:
+    """Una figura por tamaño que se vacía con clear() y se vuelve a usar."""
+
+    def __init__(self):
+        self.figuras = {}
+
+    def tomar(self, figsize):
+        fig = self.figuras.pop(figsize, None) or nueva_figura(figsize)
+        return fig, fig.add_subplot()
+
+    def soltar(self, figsize, fig):
+        fig.clear()
+        self.figuras[figsize] = fig
+
+
+class EjesReutilizados:
+    """Una figura por tamaño cuyos ejes estilados se conservan; se quitan sólo los datos."""
+
+    def __init__(self):
+        self.figuras = {}
+
+    def tomar(self, figsize):
+        fig = self.figuras.pop(figsize, None)
+        if fig is None:
+            fig = nueva_figura(figsize)
+            fig.add_subplot()
+        return fig, fig.axes[0]
+
+    def soltar(self, figsize, fig):
+        vaciar_figura(fig)
+        self.figuras[figsize] = fig
+
+
+def pngs(variante, graficos):
+    with plt.style.context(ESTILO):
+        for figsize, etiquetas, valores in graficos:
+            fig, ax = variante.tomar(figsize)
+            dibujar(fig, ax, etiquetas, valores)
+            buf = io.BytesIO()
+            fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+            variante.soltar(figsize, fig)
+            buf.seek(0)
+            yield plt.imread(buf, format="png")
+
+
+def medir(variante, graficos, guardar):
+    andamiaje = total = 0
+    with plt.style.context(ESTILO):
+        for figsize, etiquetas, valores in graficos:
+            inicio = time.perf_counter()
+            fig, ax = variante.tomar(figsize)
+            creada = time.perf_counter()
+            dibujar(fig, ax, etiquetas, valores)
+            if guardar:
+                fig.savefig(io.BytesIO(), format="png", dpi=150, bbox_inches="tight")
+            dibujada = time.perf_counter()
+            variante.soltar(figsize, fig)
+            fin = time.perf_counter()
+            andamiaje += (creada - inicio) + (fin - dibujada)
+            total += fin - inicio
+    return andamiaje * 1000 / len(graficos), total * 1000 / len(graficos)
+
+
+def main(repeticiones=5):
+    graficos = graficos_tipicos()
+    variantes = {"pyplot": Pyplot(), "figura nueva": FiguraNueva(), "clear()": FiguraVaciada(),
+                 "ejes reutilizados": EjesReutilizados()}
+    for variante in variantes.values():
+        medir(variante, graficos[:4], guardar=True)  # Calentar fuentes, cachés y plantillas
+
+    # Las variantes se alternan en cada repetición para que los cambios de carga
+    # de la máquina afecten a todas por igual
+    tiempos = {nombre: [] for nombre in variantes}
+    for _ in range(repeticiones):
+        for nombre, variante in variantes.items():
+            andamiaje, sin_guardar = medir(variante, graficos, guardar=False)
+            _, con_guardar = medir(variante, graficos, guardar=True)
+            tiempos[nombre].append((andamiaje, sin_guardar, con_guardar))
+
+    referencia = list(pngs(FiguraNueva(), graficos))
+    print(f"{len(graficos)} gráficos, mediana de {repeticiones} (ms por gráfico)")
+    print(f"{'':<18} {'andamiaje':>10} {'sin savefig':>12} {'con savefig':>12} {'idéntico':>9}")
+    for nombre, variante in variantes.items():
+        andamiaje, sin_guardar, con_guardar = np.median(tiempos[nombre], axis=0)
+        identico = all(a.shape == b.shape and (a == b).all() for a, b in zip(pngs(variante, graficos), referencia))
+        print(f"{nombre:<18} {andamiaje:10.1f} {sin_guardar:12.1f} {con_guardar:12.1f} {'sí' if identico else 'no':>9}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
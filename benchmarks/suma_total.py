@@ -0,0 +1,72 @@
+"""Compara la búsqueda de la fila "Suma Total" sobre toda la tabla con la vectorizada.
+
+Uso (desde la raíz del proyecto): python -m benchmarks.suma_total [filas]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.carga_datos import posicion_suma_total
+from scripts.preprocesamiento import aplicar_esquema
+
+
+def extracto_sintetico(filas, seed=0, filas_al_pie=0):
+    """Extracto con columnas de texto, categóricas y numéricas, terminado en "Suma Total".
+
+    Con ``filas_al_pie`` se agregan notas después de los totales y se rellena hacia
+    adelante como al leer el archivo, así que esas filas heredan "Suma Total".
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Hospital (Descripción)': rng.choice(['Hospital Carlos Van Buren (Valparaíso)',
+                                              'Hospital Claudio Vicuña ( San Antonio)',
+                                              'Hospital Dr. Eduardo Pereira Ramírez (Valparaíso)'], filas),
+        'Especialidad (Descripción )': rng.choice([f'Especialidad {i}' for i in range(40)], filas),
+        'GRD': rng.choice([f'G{i:04d}' for i in range(800)], filas),
+        'Sexo (Desc)': rng.choice(['Hombre', 'Mujer'], filas),
+        'Prevision (Desc)': rng.choice(['FONASA A', 'FONASA B', 'ISAPRE'], filas),
+        'Tipo Actividad': rng.choice(['Hospitalización', 'Cirugía Mayor Ambulatoria (CMA)'], filas),
+        'Estancia del Episodio': rng.integers(1, 60, filas),
+        'Peso GRD': rng.random(filas) * 3,
+        'Egresos': np.ones(filas),
+    })
+    df.loc[len(df) - 1, 'Especialidad (Descripción )'] = 'Suma Total'
+    if filas_al_pie:
+        notas = pd.DataFrame({'Hospital (Descripción)': [f'Filtro aplicado {i}' for i in range(filas_al_pie)]})
+        df = pd.concat([df, notas], ignore_index=True).ffill()
+    return df
+
+
+def posicion_tabla_completa(df):
+    """Búsqueda anterior: toda la tabla convertida a texto y revisada completa."""
+    coincidencias = df.apply(lambda row: row.astype(str).str.contains("Suma Total", case=False, na=False)).any(axis=1)
+    return int(coincidencias.to_numpy().argmax()) if coincidencias.any() else None
+
+
+def medir(funcion, df, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(df)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return resultado, mejor
+
+
+def main(filas=500_000):
+    for filas_al_pie in (0, 3):
+        df = extracto_sintetico(filas, filas_al_pie=filas_al_pie)
+        print(f"Extracto sintético: {filas:,} filas y {filas_al_pie} filas después de los totales")
+
+        for descripcion, datos in (('texto', df), ('categórico', aplicar_esquema(df.copy()))):
+            vectorizada, t_vectorizada = medir(posicion_suma_total, datos, 5)
+            anterior, t_anterior = medir(posicion_tabla_completa, datos, 1)
+            # El corte va en la fila de totales, no en las notas que la siguen
+            assert vectorizada == anterior == filas - 1
+            print(f"[{descripcion}] tabla completa: {t_anterior:.2f} s | vectorizada: {t_vectorizada * 1000:.2f} ms "
+                  f"| {t_anterior / t_vectorizada:,.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
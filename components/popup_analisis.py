@@ -1,19 +1,24 @@
 import flet as ft
-import pandas as pd
 import io
 import asyncio
 from zipfile import ZipFile
 from datetime import datetime
 from database import DatabaseManager
-import matplotlib.pyplot as plt
+from compression import zip_options
+from job_executor import get_job_executor
 import os
+import shutil
 
-from scripts.analisis_produccion import AnalisisProduccion
-from scripts.analisis_economico import AnalisisEconomico
-from scripts.analisis_clinico_gestion import AnalisisClinicoGestion
-from scripts.analisis_cohortes import AnalisisCohortes
+from scripts.ejecucion_paralela import ejecutar_en_paralelo, total_pasos
+from scripts.render_graficos import FORMATO_POR_DEFECTO, PERFILES, PERFIL_POR_DEFECTO, svg_disponible
+from scripts.cache_resultados import clave_resultados, guardar_resultados, leer_resultados
+from scripts.carga_datos import TAMANO_MAXIMO_EXCEL_MB, cargar_extracto, hash_archivo
+from scripts.preprocesamiento import preparar_datos
+from scripts.archivo_zip import EscritorZip, borrar_zip_trabajo, escribir_analisis, ruta_zip_trabajo
 from components.reportlab_generator import generar_pdf
 
+ETIQUETAS_PERFIL = {'pantalla': "Pantalla", 'pdf': "Informe PDF", 'impresion': "Impresión"}
+
 class PopupAnalisisManager:
     def __init__(self, page: ft.Page, user):
         self.page = page
@@ -21,7 +26,8 @@ class PopupAnalisisManager:
         self.resultados = {}
         self.current_step = 0
         self.total_steps = 0
-        self.zip_buffer = None
+        self.zip_path = None
+        self.job = None
         self.db_manager = DatabaseManager()
 
 
@@ -30,7 +36,25 @@ class PopupAnalisisManager:
         self.error_text = ft.Text("", color=ft.Colors.RED, visible=False)
         self.download_btn = ft.ElevatedButton("Descargar Resultados", visible=False)
         self.upload_btn = ft.ElevatedButton("Subir Base de Datos", on_click=self.abrir_selector_archivos)
-        self.close_btn = ft.IconButton(icon=ft.Icons.CLOSE, on_click=self.cerrar_popup)
+        # Resolución de los gráficos según dónde se van a usar (ver PERFILES)
+        self.perfil_dropdown = ft.Dropdown(
+            label="Resolución de gráficos",
+            options=[ft.dropdown.Option(key=nombre, text=f"{ETIQUETAS_PERFIL.get(nombre, nombre)} ({dpi} dpi)")
+                     for nombre, dpi in PERFILES.items()],
+            value=PERFIL_POR_DEFECTO,
+            width=250,
+        )
+        # SVG: gráficos vectoriales en el informe; requiere svglib
+        self.formato_dropdown = ft.Dropdown(
+            label="Formato de gráficos",
+            options=[ft.dropdown.Option(key="png", text="PNG"), ft.dropdown.Option(key="svg", text="SVG (vectorial)")],
+            value=FORMATO_POR_DEFECTO,
+            width=150,
+            on_change=self._on_formato_change,
+        )
+        self.opciones_row = ft.Row([self.perfil_dropdown, self.formato_dropdown], alignment=ft.MainAxisAlignment.CENTER)
+        self.close_btn = ft.IconButton(icon=ft.Icons.CLOSE, on_click=self.cerrar_popup, tooltip="Cerrar y cancelar")
+        self.background_btn = ft.TextButton("Continuar en segundo plano", icon=ft.Icons.MINIMIZE, visible=False, on_click=self.ocultar_popup)
 
         self.file_picker = ft.FilePicker()
         self.page.overlay.append(self.file_picker)
@@ -47,12 +71,14 @@ class PopupAnalisisManager:
                     ft.Text("Análisis de Base de Datos", size=20, weight=ft.FontWeight.BOLD, text_align=ft.TextAlign.CENTER),
                     self.close_btn
                 ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                self.opciones_row,
                 self.upload_btn,
                 self.status_text,
                 self.indeterminate_bar,
                 self.progress_bar,
                 self.progress_text,
                 self.error_text,
+                self.background_btn,
                 self.download_btn
             ],
                 alignment=ft.MainAxisAlignment.CENTER,
@@ -98,9 +124,9 @@ class PopupAnalisisManager:
             self.popup.update()
             return
             
-        # Validar tamaño (10MB máximo)
-        if file.size > 10 * 1024 * 1024:
-            self.error_text.value = "El archivo es demasiado grande (máximo 10MB)"
+        # Validar tamaño: los Excel se leen completos (los CSV se procesan por bloques, sin tope)
+        if ext != "csv" and file.size > TAMANO_MAXIMO_EXCEL_MB * 1024 * 1024:
+            self.error_text.value = f"El archivo Excel es demasiado grande (máximo {TAMANO_MAXIMO_EXCEL_MB}MB); use CSV para extractos grandes"
             self.error_text.visible = True
             self.status_text.visible = False
             self.indeterminate_bar.visible = False
@@ -117,59 +143,14 @@ class PopupAnalisisManager:
         # Ejecutar análisis
         self.ejecutar_analisis(e)
     
-    def crear_zip_en_memoria(self):
+    def crear_zip_en_memoria(self, resultados_analisis=None):
+        """ZIP completo en memoria, p. ej. para volver a generarlo desde las tablas guardadas."""
+        if resultados_analisis is None:
+            resultados_analisis = self.resultados
         zip_buffer = io.BytesIO()
-        with ZipFile(zip_buffer, "w") as zip_file:
-            for nombre_analisis, resultados in self.resultados.items():
-                tablas = resultados.get('tablas') or {}
-                if 'estadisticas' in resultados and isinstance(resultados['estadisticas'], pd.DataFrame):
-                    tablas = {'estadisticas': resultados['estadisticas']}
-                for nombre_tabla, df in tablas.items():
-                    # Aquí aplicamos formato sólo a columnas float con decimales
-                    df_formateado = df.copy()
-                    for col in df_formateado.columns:
-                        if pd.api.types.is_float_dtype(df_formateado[col]):
-                            # Redondear a 2 decimales
-                            df_formateado[col] = df_formateado[col].round(2)
-                        elif pd.api.types.is_integer_dtype(df_formateado[col]):
-                            # Convertir a int para evitar decimales en enteros
-                            df_formateado[col] = df_formateado[col].astype(int)
-                        # Puedes agregar más reglas si quieres formatear strings o fechas
-                    # Ahora sí pasamos a string para guardarlo en la tabla de matplotlib
-                    df_str = df_formateado.astype(str)
-
-                    ncols = len(df_str.columns)
-                    nrows = len(df_str)
-                    fig_width = max(14, ncols * 1.2)
-                    fig_height = max(1, min(0.7 * nrows, 40))
-                    fig, ax = plt.subplots(figsize=(fig_width, fig_height))
-                    ax.axis('off')
-                    col_colors = ['#4CAF50'] * ncols
-                    table = ax.table(cellText=df_str.values, colLabels=df_str.columns, loc='center', cellLoc='center', colColours=col_colors)
-                    for (row, col), cell in table.get_celld().items():
-                        cell.set_linewidth(0.5)
-                        if row == 0:
-                            cell.set_text_props(weight='bold', color='white', fontsize=14)
-                            cell.set_facecolor('#4CAF50')
-                        else:
-                            cell.set_text_props(fontsize=12)
-                            cell.set_facecolor('#F5F5F5')
-                    table.auto_set_font_size(False)
-                    table.scale(1.5, 1.5)
-                    try:
-                        plt.tight_layout()
-                    except Exception:
-                        plt.subplots_adjust(left=0.1, right=0.9, top=0.9, bottom=0.1)
-                    img_buffer = io.BytesIO()
-                    plt.savefig(img_buffer, format='png', bbox_inches='tight')
-                    plt.close(fig)
-                    img_buffer.seek(0)
-                    zip_file.writestr(f"{nombre_analisis}/tablas/{nombre_tabla}.png", img_buffer.getvalue())
-                for nombre_img, img_bytes in resultados.get('graficos', {}).items():
-                    if isinstance(img_bytes, bytes):
-                        zip_file.writestr(f"{nombre_analisis}/graficos/{nombre_img}", img_bytes)
-                    else:
-                        raise TypeError(f"Expected binary data for {nombre_img}, but got {type(img_bytes)}")
+        with ZipFile(zip_buffer, "w", **zip_options()) as zip_file:
+            for nombre_analisis, resultados in resultados_analisis.items():
+                escribir_analisis(zip_file, nombre_analisis, resultados)
         zip_buffer.seek(0)
         return zip_buffer
 
@@ -177,7 +158,9 @@ class PopupAnalisisManager:
         self.resultados = {}
         self.current_step = 0
         self.total_steps = 0
-        self.zip_buffer = None
+        # El ZIP listo para descargar es sólo de esta ventana: se borra al cerrarla
+        borrar_zip_trabajo(self.zip_path)
+        self.zip_path = None
         self.progress_bar.value = 0
         self.progress_bar.visible = False
         self.progress_text.value = ""
@@ -186,28 +169,16 @@ class PopupAnalisisManager:
         self.error_text.visible = False
         self.download_btn.visible = False
         self.download_btn.disabled = True  # <-- Deshabilitar por defecto
+        self.background_btn.visible = False
         self.upload_btn.visible = True
+        self.opciones_row.visible = True
+        self.status_text.value = ""
+        self.status_text.visible = False
+        self.indeterminate_bar.visible = False
 
-    def cargar_datos(self, path):
-        if path.endswith('.xlsx'):
-            return pd.read_excel(path, header=2)
-        elif path.endswith('.csv'):
-            return pd.read_csv(path, header=2)
-        else:
-            raise ValueError("El archivo debe ser .xlsx o .csv")
-
-    def verificar_columnas(self, df):
-        columnas_requeridas = [
-            "Año egreso", "Hospital (Descripción)", "GRD", "Especialidad (Descripción )", "Fecha de egreso completa",
-            "Sexo (Desc)", "Comuna de residencia ( Desc )", "Fecha ingreso completa", "(SI/NO) VMI", "Motivo Egreso (Descripción)",
-            "Prevision (Desc)", "Hospital de procedencia (Des )", "Estancia del Episodio", "(Sí/No) Cancer-Neoplasias",
-            "Tipo Ingreso (Descripción)", "Nivel de severidad (Descripción)", "(S/N) Egreso Quirúrgico", "(Si/No) Cesáreas", "Peso GRD",
-            "CDM (Descripción)", "Mes egreso (Descripción)", "Edad en años", "Diag 01 Principal (cod+des)", "Estancias [Norma]", "Tipo Actividad","Egresos"
-        ]
-        faltantes = [col for col in columnas_requeridas if col not in df.columns]
-        if faltantes:
-            raise ValueError(f"Faltan columnas: {', '.join(faltantes)}")
-        return df
+    def cargar_datos(self, path, huella=None):
+        # Sólo las columnas requeridas, verificadas, limpias y con el esquema aplicado; caché por contenido
+        return cargar_extracto(path, huella=huella)
 
     def update_progress(self, etapa=None):
         self.current_step += 1
@@ -220,7 +191,7 @@ class PopupAnalisisManager:
         self.popup.update()
 
     def ejecutar_analisis(self, e):
-        """Método existente con validación adicional inicial"""
+        """Valida la selección y lanza el análisis en segundo plano"""
         if not self.file_picker.result.files:
             self.error_text.value = "No se seleccionó ningún archivo."
             self.error_text.visible = True
@@ -238,108 +209,149 @@ class PopupAnalisisManager:
             self.indeterminate_bar.visible = False
             self.popup.update()
             return
-        if self.file_picker.result.files:
-            path = self.file_picker.result.files[0].path
-            try:
-                self.status_text.value = "Cargando y verificando datos..."
-                self.status_text.visible = True
-                self.indeterminate_bar.visible = True
-                self.popup.update()
-                df = self.verificar_columnas(self.cargar_datos(path))
-                df = df.ffill()  # Llenar valores nulos hacia adelante
-
-                # Convertir columna 'Egresos' a numérico
-                df['Egresos'] = pd.to_numeric(df['Egresos'], errors='coerce')
-
-                # Buscar la fila que contiene "Suma Total" en cualquier columna
-                suma_total_row = df[df.apply(lambda row: row.astype(str).str.contains("Suma Total", case=False, na=False)).any(axis=1)]
-
-                if not suma_total_row.empty:
-                    suma_idx = suma_total_row.index[0]
-
-                    # Acceder directamente al valor en la misma fila, columna 'Egresos'
-                    valor_suma_total = df.at[suma_idx, 'Egresos']
-
-                    # Cortar el DataFrame justo antes de esa fila
-                    df = df.loc[:suma_idx - 1]
+        if self.job and self.job.activo:
+            self.error_text.value = "Ya hay un análisis en curso."
+            self.error_text.visible = True
+            self.popup.update()
+            return
 
-                    # Calcular total real
-                    total_egresos = df['Egresos'].sum()
+        path = file.path
+        self.status_text.value = "Cargando y verificando datos..."
+        self.status_text.visible = True
+        self.indeterminate_bar.visible = True
+        self.upload_btn.visible = False
+        self.opciones_row.visible = False
+        self.background_btn.visible = True
+        self.popup.update()
+        # Cada trabajo escribe su propio ZIP: otros análisis abiertos no lo tocan
+        zip_path = ruta_zip_trabajo()
+        # El análisis corre en un hilo trabajador; la interfaz sólo recibe eventos
+        self.job = get_job_executor().submit(
+            "analisis", self._pipeline_analisis,
+            lambda tipo, dato: self._on_job_event(tipo, dato, zip_path),
+            path, zip_path, self.perfil_dropdown.value, self.formato_dropdown.value,
+        )
 
-                    print(f"📊 Total de pacientes indicado en 'Suma Total': {int(valor_suma_total)}")
-                    print(f"📥 Total de egresos analizados desde la base: {int(total_egresos)}")
+    def _preparar_datos(self, path, huella=None):
+        """Carga, verifica y limpia el archivo. Se ejecuta en el hilo trabajador."""
+        # Relleno de vacíos, 'Egresos' numérico y corte en "Suma Total" se hacen al leer (por bloques en CSV)
+        df = self.cargar_datos(path, huella)
 
-                    if int(valor_suma_total) != int(total_egresos):
-                        print("⚠️ ¡CUIDADO! La suma de egresos no coincide con el total declarado.")
-                else:
-                     print("⚠️ No se encontró la fila con 'Suma Total'.")
+        # Fecha en datetime, Año/Mes y ventanas de comparación, una sola vez para los cuatro análisis
+        return preparar_datos(df)
 
+    def _pipeline_analisis(self, job, path, zip_path, perfil_graficos=PERFIL_POR_DEFECTO,
+                           formato_graficos=FORMATO_POR_DEFECTO):
+        """Pipeline completo del análisis. Corre fuera del hilo de la interfaz y
+        comunica su avance a través de ``job.emitir``; nunca modifica controles."""
+        # El mismo archivo con el mismo código de análisis da los mismos resultados
+        huella = hash_archivo(path)
+        clave = clave_resultados(huella, perfil_graficos, formato_graficos)
+        resultados = leer_resultados(clave, zip_path)
+        if resultados is None:
+            datos = self._preparar_datos(path, huella)
+            job.emitir("inicio", total_pasos())
+            job.emitir("estado", "Generando tablas y gráficos (producción, económico, clínico y cohortes)...")
+            # Cada análisis se agrega al ZIP en disco apenas termina y sus gráficos
+            # se liberan: no se acumulan los cuatro en memoria
+            escritor = EscritorZip(zip_path)
+            # Los cuatro análisis son independientes: se reparten entre procesos
+            # y sus pasos vuelven como eventos de progreso del trabajo
+            resultados = ejecutar_en_paralelo(datos, path, job.progreso, job.verificar_cancelacion,
+                                              al_terminar=escritor.agregar_analisis, perfil_graficos=perfil_graficos,
+                                              formato_graficos=formato_graficos)
+            job.emitir("compresion")
+            job.verificar_cancelacion()
+            guardar_resultados(clave, resultados, zip_path)
+        # Llamar a la función de generación de PDF después de crear el zip
+        output_path = "output_path"
+        os.makedirs(output_path, exist_ok=True)
+        generar_pdf("Analisis", "path_to_images", output_path)
+        return resultados, zip_path
 
-                # Asegurarse de que la fecha esté en datetime
-                df['Fecha de egreso completa'] = pd.to_datetime(df['Fecha de egreso completa'], errors='coerce')
-                # Si no existe la columna 'Año', crearla vacía
-                if 'Año' not in df.columns:
-                    df['Año'] = pd.NA
-                # Rellenar valores faltantes de 'Año' usando la fecha
-                mascara_sin_anio = df['Año'].isna()
-                df.loc[mascara_sin_anio, 'Año'] = df.loc[mascara_sin_anio, 'Fecha de egreso completa'].dt.year
+    def _on_formato_change(self, e):
+        """Sin svglib no se puede incrustar SVG en el informe: se avisa y se vuelve a PNG."""
+        if self.formato_dropdown.value != "svg" or svg_disponible():
+            return
+        self.formato_dropdown.value = "png"
+        snackbar = ft.SnackBar(
+            content=ft.Text("svglib no está instalado: los gráficos se guardarán como PNG.", color=ft.Colors.WHITE),
+            bgcolor="#FFC107",
+            behavior=ft.SnackBarBehavior.FLOATING,
+        )
+        self.page.overlay.append(snackbar)
+        snackbar.open = True
+        self.page.update()
 
-            except Exception as ex:
-                self.error_text.value = str(ex)
-                self.error_text.visible = True
-                self.status_text.visible = False
-                self.indeterminate_bar.visible = False
-                self.popup.update()
-                return
+    def _on_job_event(self, tipo, dato, zip_path=None):
+        """Aplica en la interfaz los eventos publicados por el trabajo en curso"""
+        if tipo == "estado":
+            self.status_text.value = dato
+            self.status_text.visible = True
+            self.popup.update()
+        elif tipo == "inicio":
+            self.current_step = 0
+            self.total_steps = dato
             self.progress_bar.visible = True
             self.progress_text.visible = True
             self.upload_btn.visible = False
+            self.opciones_row.visible = False
             self.error_text.visible = False
             self.download_btn.visible = False
             self.download_btn.disabled = True
-            self.status_text.value = "Generando tablas de producción..."
-            self.status_text.visible = True
             self.indeterminate_bar.visible = True
             self.popup.update()
-            self.total_steps = (
-                AnalisisProduccion.get_total_steps() +
-                AnalisisEconomico.get_total_steps() +
-                AnalisisClinicoGestion.get_total_steps() +
-                AnalisisCohortes.get_total_steps()
-            )
-            self.resultados["produccion"] = AnalisisProduccion(self.page, path).ejecutar_analisis(df, lambda: self.update_progress("producción"))
-            self.status_text.value = "Generando tablas y gráficos económicos..."
-            self.popup.update()
-            self.resultados["economico"] = AnalisisEconomico(self.page, path).ejecutar_analisis(df, lambda: self.update_progress("económico"))
-            self.status_text.value = "Generando tablas y gráficos clínicos..."
-            self.popup.update()
-            self.resultados["clinico"] = AnalisisClinicoGestion(self.page, path).ejecutar_analisis(df, lambda: self.update_progress("clínico"))
-            self.status_text.value = "Generando tablas y gráficos de cohortes..."
-            self.popup.update()
-            self.resultados["cohortes"] = AnalisisCohortes(self.page, path).ejecutar_analisis(df, lambda: self.update_progress("cohortes"))
+        elif tipo == "progreso":
+            self.update_progress(dato)
+        elif tipo == "compresion":
             self.status_text.value = "Comprimiendo resultados..."
-            self.popup.update()
             self.progress_bar.visible = False
             self.progress_text.visible = False
-            self.zip_buffer = self.crear_zip_en_memoria()
-            # Llamar a la función de generación de PDF después de crear el zip
-            output_path = "output_path"
-            os.makedirs(output_path, exist_ok=True)
-            generar_pdf("Analisis", "path_to_images", output_path)
+            self.popup.update()
+        elif tipo == "completado":
+            if self.job is None:
+                # La ventana se cerró justo cuando terminaba: nadie va a descargarlo
+                borrar_zip_trabajo(zip_path)
+                return
+            self.resultados, self.zip_path = dato
+            self.background_btn.visible = False
             self.download_btn.visible = True
             self.download_btn.disabled = False
             self.status_text.value = "¡Análisis finalizado! Puedes descargar los resultados."
             self.indeterminate_bar.visible = False
             self.popup.update()
-        else:
-            self.error_text.value = "No se seleccionó ningún archivo."
+            if not self.popup.open:
+                self._notificar_fin_en_segundo_plano()
+        elif tipo == "error":
+            borrar_zip_trabajo(zip_path)  # Incompleto: el trabajo ya no lo escribe
+            self.error_text.value = str(dato)
             self.error_text.visible = True
             self.status_text.visible = False
             self.indeterminate_bar.visible = False
+            self.progress_bar.visible = False
+            self.progress_text.visible = False
+            self.background_btn.visible = False
+            self.upload_btn.visible = True
+            self.opciones_row.visible = True
             self.popup.update()
+        elif tipo == "cancelado":
+            borrar_zip_trabajo(zip_path)
+            print("⚠️ Análisis cancelado por el usuario.")
+
+    def _notificar_fin_en_segundo_plano(self):
+        snackbar = ft.SnackBar(
+            content=ft.Text("El análisis en segundo plano finalizó.", color=ft.Colors.WHITE),
+            bgcolor="#4CAF50",
+            behavior=ft.SnackBarBehavior.FLOATING,
+            action="Ver resultados",
+            on_action=self.mostrar_popup,
+        )
+        self.page.overlay.append(snackbar)
+        snackbar.open = True
+        self.page.update()
 
     def descargar_resultados(self, e):
-        if self.zip_buffer:
+        if self.zip_path:
             self.file_picker.on_result = self.guardar_zip
             self.file_picker.save_file(file_name="resultados.zip")
         else:
@@ -354,22 +366,23 @@ class PopupAnalisisManager:
 
 
     def guardar_zip(self, e):
-        if self.zip_buffer and e.path:
+        if self.zip_path and e.path:
             try:
-                with open(e.path, "wb") as f:
-                    f.write(self.zip_buffer.getbuffer())
-                
-                self.zip_buffer.seek(0)  # Resetear el buffer para futuras lecturas
-                zip_bytes = self.zip_buffer.read()
-                    
+                shutil.copyfile(self.zip_path, e.path)
+
                 now = datetime.now()
                 analysis_name = f"Analisis_{now.strftime('%Y-%m-%d_%H-%M-%S')}"
-                self.db_manager.insert_analysis(
-                    usuario_id=self.user[0],
-                    name=analysis_name,
-                    date=now.strftime('%Y-%m-%d %H:%M:%S'),
-                    file_content=zip_bytes
-                )
+                # El ZIP se copia al almacén por bloques desde el disco
+                with open(self.zip_path, "rb") as zip_file:
+                    self.db_manager.insert_analysis_from_file(
+                        usuario_id=self.user[0],
+                        name=analysis_name,
+                        date=now.strftime('%Y-%m-%d %H:%M:%S'),
+                        source=zip_file,
+                        # Las tablas también quedan como filas para compararlas entre
+                        # análisis, en la misma transacción que el análisis
+                        resultados=self.resultados
+                    )
                 snackbar = ft.SnackBar(content=ft.Text("Análisis guardado correctamente", color=ft.Colors.WHITE), bgcolor="#4CAF50", behavior=ft.SnackBarBehavior.FLOATING)
                 self.page.overlay.append(snackbar)
                 snackbar.open = True
@@ -386,9 +399,22 @@ class PopupAnalisisManager:
             self.page.update()
 
     def cerrar_popup(self, e):
+        # Cerrar el popup cancela el análisis en curso
+        if self.job and self.job.activo:
+            self.job.cancelar()
+        self.job = None
         self.resetear_estado()
         self.popup.open = False
         self.popup.update()
 
+    def ocultar_popup(self, e):
+        """Oculta el popup sin cancelar, para seguir navegando mientras termina el análisis"""
+        self.popup.open = False
+        self.page.update()
+
+    def mostrar_popup(self, e=None):
+        self.popup.open = True
+        self.page.update()
+
     def get_popup(self):
         return self.popup
\ No newline at end of file
@@ -1,10 +1,10 @@
 import flet as ft
-import sqlite3
 import shutil
 import os
 import tempfile
 from zipfile import ZipFile
 from components.reportlab_generator import generar_pdf
+from database import DatabaseManager
 import asyncio
 
 class PopupReportGenerator:
@@ -12,6 +12,7 @@ class PopupReportGenerator:
         self.page = page
         self.user = user
         self.db_path = db_path
+        self.db_manager = DatabaseManager()
 
         # UI components
         self.progress_bar = ft.ProgressBar(width=400, value=0, visible=False)
@@ -55,11 +56,7 @@ class PopupReportGenerator:
 
     def populate_analysis_dropdown(self, *args):
         """Populate the dropdown with available analysis options from the database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name FROM analyses WHERE usuario_id = ?", (self.user[0],))
-        analyses = cursor.fetchall()
-        conn.close()
+        analyses = self.db_manager.fetch_analyses_metadata(self.user[0])
         self.dropdown.options = [ft.DropdownOption(str(analysis[0]), analysis[1]) for analysis in analyses]
     
     def on_analysis_selected(self, e):
@@ -89,25 +86,19 @@ class PopupReportGenerator:
 
     def retrieve_analysis_zip(self, selected_analysis_id):
         """Retrieve the .zip file from the database and process it."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT file_content FROM analyses WHERE id = ?", (selected_analysis_id,))
-        analysis_data = cursor.fetchone()
-        conn.close()
-
-        if not analysis_data:
-            self.error_text.value = "No se encontró el análisis seleccionado."
-            self.error_text.visible = True
-            self.page.update()
-            return
-
         # Create temp directory and save the zip file
         temp_base_dir = os.path.join('storage', 'data', 'temp')
         os.makedirs(temp_base_dir, exist_ok=True)
 
         zip_path = os.path.join(temp_base_dir, f"analysis_{selected_analysis_id}.zip")
-        with open(zip_path, 'wb') as zip_file:
-            zip_file.write(analysis_data[0])
+        # Copy the stored ZIP straight to disk in chunks
+        copied = self.db_manager.copy_analysis_file(int(selected_analysis_id), zip_path)
+
+        if copied is None:
+            self.error_text.value = "No se encontró el análisis seleccionado."
+            self.error_text.visible = True
+            self.page.update()
+            return
 
         # Extract zip contents
         extract_path = f"storage/temp/analysis_{selected_analysis_id}/"
@@ -145,10 +136,14 @@ class PopupReportGenerator:
             tables_path = f"{extract_path}/{analysis_type}/tablas"
 
             if os.path.exists(graphics_path):
-                graphics.extend([os.path.join(graphics_path, f) for f in os.listdir(graphics_path) if f.endswith('.png')])
+                graphics.extend([os.path.join(graphics_path, f) for f in os.listdir(graphics_path) if f.endswith(('.png', '.svg'))])
 
             if os.path.exists(tables_path):
-                tables.extend([os.path.join(tables_path, f) for f in os.listdir(tables_path) if f.endswith('.png')])
+                # Las tablas vienen como CSV; las PNG sólo se usan si no hay CSV (ZIP antiguos)
+                table_files = os.listdir(tables_path)
+                csv_names = {os.path.splitext(f)[0] for f in table_files if f.endswith('.csv')}
+                tables.extend([os.path.join(tables_path, f) for f in table_files
+                               if f.endswith('.csv') or (f.endswith('.png') and os.path.splitext(f)[0] not in csv_names)])
 
         if not graphics:
             self.show_snackbar("No se encontraron gráficos en el análisis seleccionado.", ft.Colors.RED)
@@ -181,7 +176,12 @@ class PopupReportGenerator:
         self.show_snackbar("Informe generado exitosamente.", ft.Colors.GREEN)
 
         # Save the report in the database
-        self.save_report_to_db(f"Informe_{self.user[0]}", pdf_path)
+        # El PDF sólo tiene imágenes: se indexan el nombre del análisis y los de gráficos y tablas
+        analysis_name = next((option.text for option in self.dropdown.options if option.key == self.dropdown.value), "")
+        search_text = " ".join(
+            [analysis_name] + [os.path.splitext(os.path.basename(f))[0] for f in graphics + tables]
+        )
+        self.save_report_to_db(f"Informe_{self.user[0]}", pdf_path, search_text)
 
     def generate_report_pdf(self, graphics, tables):
         """Genera el informe en formato PDF utilizando ReportLab."""
@@ -210,18 +210,10 @@ class PopupReportGenerator:
 
         return pdf_path
 
-    def save_report_to_db(self, report_name, pdf_path):
+    def save_report_to_db(self, report_name, pdf_path, search_text=None):
         """Save the generated report PDF to the database."""
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
         with open(pdf_path, 'rb') as f:
-            blob = f.read()
-        cur.execute(
-            "INSERT INTO reports (name, date, report) VALUES (?, DATE('now'), ?)",
-            (report_name, blob)
-        )
-        conn.commit()
-        conn.close()
+            self.db_manager.insert_report_from_file(self.user[0], report_name, f, search_text=search_text)
 
     def show_popup(self):
         self.popup.alignment = ft.alignment.center
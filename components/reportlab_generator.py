@@ -1,13 +1,42 @@
+from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
+import pandas as pd
 import os
 
+try:
+    # Opcional: incrusta los gráficos SVG como vectores en el PDF
+    from reportlab.graphics import renderPDF
+    from svglib.svglib import svg2rlg
+except ImportError:
+    svg2rlg = None
+
+ANCHO_TABLA = 512  # Ancho útil de la página carta con márgenes de 50
+ANCHO_GRAFICO = 500
+ALTO_GRAFICO = 200
+MARGEN_INFERIOR = 60
+
+ESTILO_TABLA = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F5F5F5')),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 7),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+])
+ESTILO_ENCABEZADO = ParagraphStyle('encabezado', fontName='Helvetica-Bold', fontSize=7, leading=8,
+                                   textColor=colors.white, alignment=1)
+
+
 def generar_pdf(nombre_analisis, ruta_imagenes, ruta_salida):
     """
     Genera un informe PDF a partir de imágenes extraídas de un análisis.
 
     :param nombre_analisis: Nombre del análisis (variable).
-    :param ruta_imagenes: Ruta donde se encuentran las imágenes extraídas.
+    :param ruta_imagenes: Ruta donde se encuentran las imágenes (y tablas .csv) extraídas.
     :param ruta_salida: Ruta donde se guardará el PDF generado.
     """
     pdf_path = os.path.join(ruta_salida, f"report_{nombre_analisis}.pdf")
@@ -27,9 +56,71 @@ def generar_pdf(nombre_analisis, ruta_imagenes, ruta_salida):
                 if y_position < 100:  # Nueva página si no hay espacio
                     c.showPage()
                     y_position = 750
-                c.drawImage(image_path, 50, y_position - 200, width=500, height=200, preserveAspectRatio=True, anchor='c')
+                c.drawImage(image_path, 50, y_position - ALTO_GRAFICO, width=ANCHO_GRAFICO, height=ALTO_GRAFICO,
+                            preserveAspectRatio=True, anchor='c')
                 c.drawString(50, y_position - 220, file)  # Nombre de la imagen
                 y_position -= 250
+            elif file.endswith(".svg"):
+                if svg2rlg is None:
+                    print(f"⚠️ svglib no está instalado: se omite el gráfico {file}")
+                    continue
+                if y_position < 100:
+                    c.showPage()
+                    y_position = 750
+                dibujar_svg(c, os.path.join(root, file), y_position - ALTO_GRAFICO)
+                c.drawString(50, y_position - 220, file)
+                y_position -= 250
+            elif file.endswith(".csv"):
+                y_position = dibujar_tabla(c, os.path.join(root, file), y_position)
 
     c.save()
     return pdf_path
+
+
+def dibujar_svg(c, ruta_svg, y):
+    """Dibuja un gráfico SVG como vectores en el recuadro de 500x200 que ocupan los PNG."""
+    dibujo = svg2rlg(ruta_svg)
+    escala = min(ANCHO_GRAFICO / dibujo.width, ALTO_GRAFICO / dibujo.height)
+    dibujo.scale(escala, escala)
+    dibujo.width, dibujo.height = dibujo.width * escala, dibujo.height * escala
+    # Centrado como los PNG (anchor='c')
+    x = 50 + (ANCHO_GRAFICO - dibujo.width) / 2
+    y += (ALTO_GRAFICO - dibujo.height) / 2
+    renderPDF.draw(dibujo, c, x, y)
+
+
+def dibujar_tabla(c, ruta_csv, y_position):
+    """Dibuja una tabla .csv como tabla de ReportLab (texto, no imagen), partiéndola entre páginas.
+
+    Devuelve la nueva posición vertical.
+    """
+    df = pd.read_csv(ruta_csv, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    encabezado = [Paragraph(str(col), ESTILO_ENCABEZADO) for col in df.columns]
+    ancho_columna = ANCHO_TABLA / max(len(df.columns), 1)
+    pendientes = [Table([encabezado] + df.values.tolist(), colWidths=ancho_columna, repeatRows=1, style=ESTILO_TABLA)]
+
+    if y_position < 150:
+        c.showPage()
+        y_position = 750
+    c.setFont("Helvetica", 12)
+    c.drawString(50, y_position - 15, os.path.basename(ruta_csv))  # Nombre de la tabla
+    y_position -= 25
+
+    while pendientes:
+        parte = pendientes.pop(0)
+        disponible = y_position - MARGEN_INFERIOR
+        _, alto = parte.wrapOn(c, ANCHO_TABLA, disponible)
+        if alto > disponible:
+            trozos = parte.split(ANCHO_TABLA, disponible)
+            if len(trozos) > 1:
+                pendientes = trozos + pendientes
+                continue
+            if y_position < 750:
+                # Ni una fila cabe en lo que queda de la página
+                c.showPage()
+                y_position = 750
+                pendientes.insert(0, parte)
+                continue
+        parte.drawOn(c, 50, y_position - alto)
+        y_position -= alto + 30
+    return y_position
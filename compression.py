@@ -0,0 +1,94 @@
+import importlib
+import importlib.util
+import lzma
+import zipfile
+import zlib
+
+# Compresión de los ZIP de análisis ("none", "deflate", "lzma" o "zstd")
+ARCHIVE_CODEC = "deflate"
+ARCHIVE_LEVEL = 1  # Con PNG, nivel 1 comprime igual o más que 9 y es más rápido (benchmarks/compresion.py)
+# Compresión de los informes PDF en el almacén de artefactos
+STORE_CODEC = "deflate"
+STORE_LEVEL = 6
+
+CODECS = ("none", "deflate", "lzma", "zstd")
+# Extensión del archivo guardado en el almacén según su compresión
+SUFFIXES = {"none": "", "deflate": ".zz", "lzma": ".xz", "zstd": ".zst"}
+DEFAULT_LEVELS = {"none": None, "deflate": 6, "lzma": 6, "zstd": 3}
+
+
+def zstd_module():
+    """Módulo ``zstandard`` si está instalado; si no, None."""
+    if importlib.util.find_spec("zstandard"):
+        return importlib.import_module("zstandard")
+    return None
+
+
+def available_codecs():
+    return tuple(codec for codec in CODECS if codec != "zstd" or zstd_module() is not None)
+
+
+def resolve_codec(codec):
+    """Valida ``codec``; zstd sin el paquete instalado vuelve a deflate."""
+    codec = codec or "none"
+    if codec not in CODECS:
+        raise ValueError(f"Compresión desconocida: {codec}")
+    if codec == "zstd" and zstd_module() is None:
+        print("⚠️ zstandard no está instalado, se usa deflate")
+        return "deflate"
+    return codec
+
+
+def zip_options(codec=ARCHIVE_CODEC, level=ARCHIVE_LEVEL):
+    """Argumentos ``compression``/``compresslevel`` para ``ZipFile``.
+
+    zstd dentro de un ZIP requiere Python 3.14; antes se usa deflate. lzma
+    no admite nivel en zipfile.
+    """
+    codec = resolve_codec(codec)
+    if codec == "zstd" and not hasattr(zipfile, "ZIP_ZSTANDARD"):
+        codec = "deflate"
+    if codec == "none":
+        return {"compression": zipfile.ZIP_STORED}
+    if codec == "lzma":
+        return {"compression": zipfile.ZIP_LZMA}
+    if level is None:
+        level = DEFAULT_LEVELS[codec]
+    if codec == "zstd":
+        return {"compression": zipfile.ZIP_ZSTANDARD, "compresslevel": level}
+    return {"compression": zipfile.ZIP_DEFLATED, "compresslevel": level}
+
+
+def compressor(codec, level=None):
+    """Objeto con ``compress(chunk)`` y ``flush()`` para comprimir por bloques."""
+    if level is None:
+        level = DEFAULT_LEVELS[codec]
+    if codec == "deflate":
+        return zlib.compressobj(level)
+    if codec == "lzma":
+        return lzma.LZMACompressor(preset=level)
+    if codec == "zstd":
+        return zstd_module().ZstdCompressor(level=level).compressobj()
+    return _Passthrough()
+
+
+def decompressor(codec):
+    """Objeto con ``decompress(chunk)`` para leer por bloques lo que escribió ``compressor``."""
+    if codec == "deflate":
+        return zlib.decompressobj()
+    if codec == "lzma":
+        return lzma.LZMADecompressor()
+    if codec == "zstd":
+        return zstd_module().ZstdDecompressor().decompressobj()
+    return _Passthrough()
+
+
+class _Passthrough:
+    def compress(self, chunk):
+        return chunk
+
+    def decompress(self, chunk):
+        return chunk
+
+    def flush(self):
+        return b""
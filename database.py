@@ -1,6 +1,16 @@
+import hashlib
+import io
+import json
 import os
+import re
 import sys
 import sqlite3
+import threading
+import zipfile
+from datetime import datetime
+import pandas as pd
+from artifact_store import ArtifactStore
+from compression import STORE_CODEC, STORE_LEVEL
 
 def resource_path(relative_path):
     """Obtiene la ruta absoluta, funciona tanto en desarrollo como en .exe empaquetado"""
@@ -12,18 +22,229 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
+BLOB_CHUNK_SIZE = 1024 * 1024  # Bytes copiados por bloque desde BLOBs antiguos
+
+
+def copy_blob_to_file(conn, table, column, row_id, destination):
+    """Copia un BLOB a ``destination`` (ruta o archivo binario abierto) por bloques.
+
+    Devuelve la cantidad de bytes copiados o None si la fila no existe.
+    """
+    try:
+        blob = conn.blobopen(table, column, row_id, readonly=True)
+    except sqlite3.OperationalError:
+        return None
+    with blob:
+        if isinstance(destination, (str, os.PathLike)):
+            with open(destination, "wb") as f:
+                return _copy_blob(blob, f)
+        return _copy_blob(blob, destination)
+
+
+def _copy_blob(blob, destination):
+    copied = 0
+    while True:
+        chunk = blob.read(BLOB_CHUNK_SIZE)
+        if not chunk:
+            return copied
+        destination.write(chunk)
+        copied += len(chunk)
+
+
+def _column_values(serie):
+    """Valores de una columna como tipos de Python aptos para JSON (NaN/NaT -> None)."""
+    nulos = serie.isna().tolist()
+    if isinstance(serie.dtype, pd.PeriodDtype):
+        serie = serie.astype(str)
+    return [None if nulo else valor for valor, nulo in zip(serie.tolist(), nulos)]
+
+
+def _column_spec(column, dtype):
+    """``[nombre, dtype]`` de una columna; las categóricas agregan sus categorías y si tienen orden."""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return [str(column), "category",
+                {"categories": _column_values(pd.Series(dtype.categories)), "ordered": bool(dtype.ordered)}]
+    return [str(column), str(dtype)]
+
+
+def _restore_column(values, dtype, extra=None):
+    serie = pd.Series(values, dtype=object)
+    if dtype == "category" and extra:
+        # Mismas categorías y en el mismo orden (p. ej. grupos etarios de menor a mayor)
+        dtype = pd.CategoricalDtype(extra["categories"], ordered=extra["ordered"])
+    try:
+        return serie.astype(dtype)
+    except (TypeError, ValueError):
+        # Tipos que no se pueden reconstruir (p. ej. enteros con nulos) quedan como objeto
+        return serie.infer_objects()
+
+
+# Texto indexado de un informe: el texto guardado para búsqueda o el propio informe si es texto
+REPORT_SEARCH_CONTENT = "COALESCE({row}.search_text, CASE WHEN typeof({row}.report) = 'text' THEN {row}.report ELSE '' END)"
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"  # "análisis" también encuentra "analisis"
+
+
+def fts_query(text):
+    """Convierte lo que escribe el usuario en una consulta FTS5: todas las palabras, como prefijos."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text or ""))
+
+
+# Fechas que se pueden escribir en la búsqueda: 2025, 2025-06, 2025-06-15, 06/2025 o 15/06/2025
+DATE_TERM = re.compile(r"\b(?:(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?|(?:(\d{1,2})/)?(\d{1,2})/(\d{4}))\b")
+
+
+def date_terms(text):
+    """Separa las fechas del resto del texto: ``(prefijos ISO de fecha, texto restante)``.
+
+    Las fechas se guardan como "YYYY-MM-DD HH:MM:SS", así que cada fecha escrita
+    se convierte en el prefijo que deben tener las fechas que coinciden.
+    """
+    prefixes = []
+
+    def to_prefix(match):
+        year, month, day = (match[1], match[2], match[3]) if match[1] else (match[6], match[5], match[4])
+        prefixes.append("-".join([year] + [part.zfill(2) for part in (month, day) if part]))
+        return " "
+    return prefixes, DATE_TERM.sub(to_prefix, text or "")
+
+
+HISTORY_FORMAT_VERSION = 1  # Versión del archivo de exportación (manifest.json)
+IMPORT_BATCH_SIZE = 1000  # Filas por executemany al importar
+
+# Retención (opcional, cada usuario la activa en Configuración): se conservan
+# siempre los últimos N análisis/informes; de los que tienen más de
+# RETENTION_MONTHLY_AFTER_DAYS días queda sólo el último de cada mes y el resto
+# de los que exceden los N se borra. Son los valores propuestos al activarla.
+RETENTION_KEEP_LAST = 100
+RETENTION_MONTHLY_AFTER_DAYS = 365
+RETENTION_BATCH_SIZE = 200  # Filas borradas por transacción
+
+# Un archivo del almacén sin filas que lo referencien sólo se borra si es más
+# antiguo que esto: put_file guarda el archivo antes de insertar su fila
+ARTIFACT_GRACE_SECONDS = 3600
+VACUUM_PAGES_PER_STEP = 256  # Páginas liberadas por paso de incremental_vacuum
+
+
+def get_artifact_store():
+    return ArtifactStore(resource_path("artifacts"), codec=STORE_CODEC, level=STORE_LEVEL)
+
+
+# Ajustes de cada conexión: WAL deja leer mientras otro hilo escribe
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",     # Con WAL es seguro y evita un fsync por transacción
+    "PRAGMA cache_size = -32000",      # ~32 MB de caché de páginas
+    "PRAGMA mmap_size = 268435456",    # Lecturas de hasta 256 MB mapeadas en memoria
+    "PRAGMA busy_timeout = 5000",      # Esperar al escritor en vez de fallar con "database is locked"
+    "PRAGMA foreign_keys = ON",
+)
+
+
+class ConnectionPool:
+    """Una conexión por hilo para una base, compartida por todos los DatabaseManager.
+
+    La interfaz y los trabajos en segundo plano usan conexiones distintas, así
+    que una escritura larga no bloquea las lecturas de las listas.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.schema_ready = False
+        self.schema_lock = threading.Lock()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = set()
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.add(conn)
+        return conn
+
+    def release(self):
+        """Cierra la conexión del hilo actual."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                self._connections.discard(conn)
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Conexiones de otros hilos: se cierran solas cuando su hilo termina
+                pass
+        self._local = threading.local()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    db_path = db_path or resource_path("app_data.db")  # Ajusta el nombre si tu base se llama distinto
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ConnectionPool(db_path)
+        return pool
+
+
 def get_connection():
-    db_path = resource_path("app_data.db")  # Ajusta el nombre si tu base se llama distinto
-    conn = sqlite3.connect(db_path)
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    return get_pool().connection()
 
 class DatabaseManager:
-    def __init__(self):
-        self.connection = get_connection()
-        # Verifica si las tablas ya existen antes de intentar crearlas
-        if not self.tables_exist():
-            self.create_tables()
+    # Migraciones en orden: la base guarda en PRAGMA user_version cuántas ya se
+    # aplicaron. Cada una es idempotente, así que repetir una interrumpida es seguro.
+    # Nunca reordenar ni borrar: sólo agregar al final.
+    MIGRATIONS = (
+        "create_tables",
+        "update_reports_table",
+        "update_artifact_columns",
+        "move_blobs_to_artifacts",
+        "create_user_date_indexes",
+        "create_result_tables",
+        "enable_incremental_vacuum",
+        "create_search_index",
+        "create_retention_policies",
+    )
+
+    def __init__(self, db_path=None):
+        self.pool = get_pool(db_path)
+        # ZIP y PDF viven fuera de la base, en un directorio direccionado por contenido
+        self.artifacts = get_artifact_store()
+        # El esquema se revisa una vez por proceso, no en cada DatabaseManager
+        with self.pool.schema_lock:
+            if not self.pool.schema_ready:
+                self.migrate()
+                self.pool.schema_ready = True
+
+    def schema_version(self):
+        return self.connection.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self):
+        """Aplica las migraciones pendientes y actualiza PRAGMA user_version tras cada una."""
+        version = self.schema_version()
+        for number, name in enumerate(self.MIGRATIONS[version:], start=version + 1):
+            getattr(self, name)()
+            with self.connection:
+                self.connection.execute(f"PRAGMA user_version = {number}")
+            print(f"Migración {number} aplicada: {name}")
+
+    @property
+    def connection(self):
+        """Conexión del hilo actual."""
+        return self.pool.connection()
 
     def tables_exist(self):
         """Verifica si las tablas ya existen en la base de datos."""
@@ -50,6 +271,8 @@ class DatabaseManager:
                     name TEXT NOT NULL,
                     date TEXT NOT NULL,
                     file_content BLOB NOT NULL,
+                    artifact_hash TEXT,
+                    artifact_size INTEGER,
                     FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
                 )
             """)
@@ -60,6 +283,8 @@ class DatabaseManager:
                     name TEXT NOT NULL,
                     date TEXT NOT NULL,
                     report BLOB NOT NULL,
+                    artifact_hash TEXT,
+                    artifact_size INTEGER,
                     FOREIGN KEY (usuario_id) REFERENCES usuarios(id)
                 )
             """)
@@ -76,6 +301,206 @@ class DatabaseManager:
                 self.connection.execute("UPDATE reports SET usuario_id = 1")  # Asignar un valor por defecto
                 print("Columna usuario_id agregada a la tabla reports.")
 
+    def update_artifact_columns(self):
+        """Agrega artifact_hash/artifact_size a analyses y reports si no existen."""
+        with self.connection:
+            for table in ("analyses", "reports"):
+                columns = self.connection.execute(f"PRAGMA table_info({table})").fetchall()
+                column_names = [column[1] for column in columns]
+                if "artifact_hash" not in column_names:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN artifact_hash TEXT")
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN artifact_size INTEGER")
+                    print(f"Columnas de artefactos agregadas a la tabla {table}.")
+
+    def move_blobs_to_artifacts(self):
+        """Mueve al almacén de artefactos los ZIP/PDF que aún están dentro de la base."""
+        for table, column in (("analyses", "file_content"), ("reports", "report")):
+            rows = self.connection.execute(
+                f"SELECT id FROM {table} WHERE artifact_hash IS NULL AND typeof({column}) = 'blob' AND length({column}) > 0"
+            ).fetchall()
+            for (row_id,) in rows:
+                with self.connection:
+                    with self.connection.blobopen(table, column, row_id, readonly=True) as blob:
+                        digest, size = self.artifacts.put_file(blob, codec=self._artifact_codec(table))
+                    self.connection.execute(
+                        f"UPDATE {table} SET {column} = x'', artifact_hash = ?, artifact_size = ? WHERE id = ?",
+                        (digest, size, row_id)
+                    )
+            if rows:
+                print(f"{len(rows)} archivos de {table} movidos al almacén de artefactos.")
+
+    def create_user_date_indexes(self):
+        """Índices para las listas por usuario ordenadas por fecha (WHERE usuario_id = ? ORDER BY date DESC)."""
+        with self.connection:
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_analyses_usuario_date ON analyses (usuario_id, date)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_reports_usuario_date ON reports (usuario_id, date)")
+
+    def create_result_tables(self):
+        """Tablas de resultados de cada análisis guardadas como filas consultables.
+
+        ``result_tables`` describe cada tabla (sección, nombre y columnas con su
+        dtype) y ``result_rows`` guarda cada fila como un objeto JSON
+        ``{columna: valor}``, así que se puede filtrar con json_extract.
+        """
+        with self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS result_tables (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    analysis_id INTEGER NOT NULL,
+                    section TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    columns TEXT NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    UNIQUE (analysis_id, section, name),
+                    FOREIGN KEY (analysis_id) REFERENCES analyses(id) ON DELETE CASCADE
+                )
+            """)
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS result_rows (
+                    table_id INTEGER NOT NULL,
+                    row_index INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (table_id, row_index),
+                    FOREIGN KEY (table_id) REFERENCES result_tables(id) ON DELETE CASCADE
+                ) WITHOUT ROWID
+            """)
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_result_tables_section_name ON result_tables (section, name)")
+
+    def enable_incremental_vacuum(self):
+        """Activa auto_vacuum incremental; en una base existente requiere un VACUUM completo (una sola vez)."""
+        if self.connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            self.connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.connection.execute("VACUUM")
+
+    def create_search_index(self):
+        """Índices FTS5 de informes (título y contenido) y de nombres de análisis.
+
+        El rowid de cada índice es el id de la fila y los triggers los mantienen
+        al día en cada INSERT/UPDATE/DELETE.
+        """
+        report_new = REPORT_SEARCH_CONTENT.format(row="new")
+        with self.connection:
+            columns = [column[1] for column in self.connection.execute("PRAGMA table_info(reports)").fetchall()]
+            if "search_text" not in columns:
+                self.connection.execute("ALTER TABLE reports ADD COLUMN search_text TEXT")
+            self.connection.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(name, content, tokenize = '{SEARCH_TOKENIZER}')")
+            self.connection.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5(name, tokenize = '{SEARCH_TOKENIZER}')")
+            self.connection.executescript(f"""
+                CREATE TRIGGER IF NOT EXISTS reports_fts_insert AFTER INSERT ON reports BEGIN
+                    INSERT INTO reports_fts (rowid, name, content) VALUES (new.id, new.name, {report_new});
+                END;
+                CREATE TRIGGER IF NOT EXISTS reports_fts_delete AFTER DELETE ON reports BEGIN
+                    DELETE FROM reports_fts WHERE rowid = old.id;
+                END;
+                CREATE TRIGGER IF NOT EXISTS reports_fts_update AFTER UPDATE OF name, report, search_text ON reports BEGIN
+                    DELETE FROM reports_fts WHERE rowid = old.id;
+                    INSERT INTO reports_fts (rowid, name, content) VALUES (new.id, new.name, {report_new});
+                END;
+                CREATE TRIGGER IF NOT EXISTS analyses_fts_insert AFTER INSERT ON analyses BEGIN
+                    INSERT INTO analyses_fts (rowid, name) VALUES (new.id, new.name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS analyses_fts_delete AFTER DELETE ON analyses BEGIN
+                    DELETE FROM analyses_fts WHERE rowid = old.id;
+                END;
+                CREATE TRIGGER IF NOT EXISTS analyses_fts_update AFTER UPDATE OF name ON analyses BEGIN
+                    DELETE FROM analyses_fts WHERE rowid = old.id;
+                    INSERT INTO analyses_fts (rowid, name) VALUES (new.id, new.name);
+                END;
+            """)
+            # Filas que ya existían antes de los triggers
+            self.connection.execute("DELETE FROM reports_fts")
+            self.connection.execute(
+                f"INSERT INTO reports_fts (rowid, name, content) SELECT id, name, {REPORT_SEARCH_CONTENT.format(row='reports')} FROM reports"
+            )
+            self.connection.execute("DELETE FROM analyses_fts")
+            self.connection.execute("INSERT INTO analyses_fts (rowid, name) SELECT id, name FROM analyses")
+
+    def create_retention_policies(self):
+        """Política de retención de cada usuario; sin fila (o enabled = 0) no se borra nada."""
+        with self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS retention_policies (
+                    usuario_id INTEGER PRIMARY KEY REFERENCES usuarios(id) ON DELETE CASCADE,
+                    enabled INTEGER NOT NULL DEFAULT 0,
+                    keep_last INTEGER NOT NULL,
+                    monthly_after_days INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+    @staticmethod
+    def _artifact_codec(table):
+        # Los ZIP de análisis ya vienen comprimidos; sólo se comprimen los informes
+        return "none" if table == "analyses" else None
+
+    def _copy_stored_file(self, table, column, row_id, destination):
+        row = self.connection.execute(f"SELECT artifact_hash FROM {table} WHERE id = ?", (row_id,)).fetchone()
+        if row is None:
+            return None
+        if row[0]:
+            return self.artifacts.copy_to(row[0], destination)
+        # Filas antiguas que todavía guardan el archivo en la base
+        return copy_blob_to_file(self.connection, table, column, row_id, destination)
+
+    def _read_stored_file(self, table, column, row_id):
+        buffer = io.BytesIO()
+        if self._copy_stored_file(table, column, row_id, buffer) is None:
+            return None
+        return buffer.getvalue()
+
+    def _referenced(self, digest):
+        return self.connection.execute(
+            "SELECT EXISTS(SELECT 1 FROM analyses WHERE artifact_hash = ?1) "
+            "OR EXISTS(SELECT 1 FROM reports WHERE artifact_hash = ?1)",
+            (digest,)
+        ).fetchone()[0]
+
+    def release_artifacts(self, digests, grace_seconds=ARTIFACT_GRACE_SECONDS):
+        """Borra del almacén los archivos de ``digests`` que ya ninguna fila referencia.
+
+        Se usa después de borrar filas, con los hashes leídos antes del DELETE.
+        Los guardados hace menos de ``grace_seconds`` se dejan: pueden ser de
+        una fila que otro hilo está por insertar; si quedan sin uso los borra
+        collect_orphan_artifacts, que la aplicación ejecuta al iniciar.
+        """
+        removed = 0
+        for digest in set(digests):
+            if digest is None or self._referenced(digest):
+                continue
+            age = self.artifacts.age(digest)
+            if age is not None and age >= grace_seconds:
+                self.artifacts.delete(digest)
+                removed += 1
+        return removed
+
+    def collect_orphan_artifacts(self, grace_seconds=ARTIFACT_GRACE_SECONDS):
+        """Mantenimiento: recorre todo el almacén y borra los archivos sin filas.
+
+        Recorre el directorio completo, así que no se llama al borrar sino una
+        vez al iniciar la aplicación (main.py); los archivos guardados hace
+        menos de ``grace_seconds`` se respetan.
+        """
+        referenced = {
+            digest for (digest,) in self.connection.execute(
+                "SELECT artifact_hash FROM analyses WHERE artifact_hash IS NOT NULL "
+                "UNION SELECT artifact_hash FROM reports WHERE artifact_hash IS NOT NULL"
+            )
+        }
+        removed = 0
+        for digest in list(self.artifacts.digests()):
+            if digest in referenced:
+                continue
+            age = self.artifacts.age(digest)
+            if age is not None and age >= grace_seconds and not self._referenced(digest):
+                self.artifacts.delete(digest)
+                removed += 1
+        return removed
+
+    def verify_artifacts(self):
+        """Ids de análisis cuyo archivo falta o no coincide con su hash."""
+        rows = self.connection.execute("SELECT id, artifact_hash FROM analyses WHERE artifact_hash IS NOT NULL").fetchall()
+        return [row_id for row_id, digest in rows if not self.artifacts.verify(digest)]
+
     # Usuarios
     def insert_user(self, username, password_hash, email, fecha_registro):
         with self.connection:
@@ -92,12 +517,38 @@ class DatabaseManager:
 
     # Analyses
     def insert_analysis(self, usuario_id, name, date, file_content):
+        return self.insert_analysis_from_file(usuario_id, name, date, io.BytesIO(file_content))
+
+    def insert_analysis_from_file(self, usuario_id, name, date, source, size=None, resultados=None):
+        """Guarda el ZIP (archivo binario abierto) en el almacén y la referencia en la base.
+
+        Con ``resultados`` sus tablas se guardan en la misma transacción que la
+        fila del análisis: si algo falla no queda un análisis sin tablas.
+        """
+        digest, size = self.artifacts.put_file(source, codec=self._artifact_codec("analyses"))
+        try:
+            with self.connection:
+                analysis_id = self.connection.execute(
+                    "INSERT INTO analyses (usuario_id, name, date, file_content, artifact_hash, artifact_size) VALUES (?, ?, ?, x'', ?, ?)",
+                    (usuario_id, name, date, digest, size)
+                ).lastrowid
+                if resultados:
+                    self._write_result_tables(analysis_id, resultados)
+        except Exception:
+            self.release_artifacts([digest])
+            raise
+        return analysis_id
+
+    def insert_report_from_file(self, usuario_id, name, source, size=None, search_text=None):
+        """Guarda el PDF en el almacén; ``search_text`` es el texto por el que se podrá buscar el informe."""
+        digest, size = self.artifacts.put_file(source)
         with self.connection:
-            self.connection.execute(
-                "INSERT INTO analyses (usuario_id, name, date, file_content) VALUES (?, ?, ?, ?)",
-                (usuario_id, name, date, file_content)
-            )
-            
+            return self.connection.execute(
+                "INSERT INTO reports (usuario_id, name, date, report, artifact_hash, artifact_size, search_text) "
+                "VALUES (?, ?, datetime('now'), x'', ?, ?, ?)",
+                (usuario_id, name, digest, size, search_text)
+            ).lastrowid
+
     def insert_report(self, user_id, analysis_id, content):
         with self.connection:
             self.connection.execute(
@@ -108,42 +559,518 @@ class DatabaseManager:
     def fetch_analyses_by_user(self, usuario_id):
         with self.connection:
             results = self.connection.execute(
-                "SELECT id, name, date, file_content FROM analyses WHERE usuario_id = ? ORDER BY date DESC",
+                "SELECT id, name, date FROM analyses WHERE usuario_id = ? ORDER BY date DESC",
                 (usuario_id,)
             ).fetchall()
             # Ensure file_content is returned as bytes
-            return [(id, name, date, bytes(file_content)) for id, name, date, file_content in results]
+            return [(id, name, date, self._read_stored_file("analyses", "file_content", id)) for id, name, date in results]
 
-    def fetch_analysis_file(self, analysis_id):
+    def fetch_analyses_metadata(self, usuario_id, limit=None, offset=0):
+        """Lista (id, name, date, size) sin leer los ZIP; size es el tamaño en bytes."""
         with self.connection:
             return self.connection.execute(
-                "SELECT file_content FROM analyses WHERE id = ?",
-                (analysis_id,)
-            ).fetchone()
+                "SELECT id, name, date, COALESCE(artifact_size, length(file_content)) FROM analyses WHERE usuario_id = ? "
+                "ORDER BY date DESC LIMIT ? OFFSET ?",
+                (usuario_id, -1 if limit is None else limit, offset)
+            ).fetchall()
+
+    def count_analyses_by_user(self, usuario_id):
+        with self.connection:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM analyses WHERE usuario_id = ?",
+                (usuario_id,)
+            ).fetchone()[0]
+
+    def fetch_analysis_file(self, analysis_id):
+        with self.connection:
+            content = self._read_stored_file("analyses", "file_content", analysis_id)
+            return None if content is None else (content,)
+
+    def copy_analysis_file(self, analysis_id, destination):
+        """Escribe el ZIP del análisis en ``destination`` por bloques; devuelve los bytes copiados."""
+        with self.connection:
+            return self._copy_stored_file("analyses", "file_content", analysis_id, destination)
 
     def delete_analysis_by_id(self, analysis_id):
         with self.connection:
+            digests = self._artifact_hashes("analyses", [analysis_id])
+            # Las tablas de resultados se borran en cascada
             self.connection.execute(
                 "DELETE FROM analyses WHERE id = ?",
                 (analysis_id,)
             )
+        # El ZIP se borra del almacén si ninguna otra fila lo usa
+        self.release_artifacts(digests)
+
+    # Tablas de resultados
+    def save_result_tables(self, analysis_id, resultados):
+        """Guarda las tablas de ``resultados`` ({seccion: {'tablas': {nombre: DataFrame}}}) del análisis.
+
+        Todo se escribe en una transacción: o quedan todas las tablas o ninguna.
+        Reemplaza las tablas que el análisis tuviera guardadas.
+        """
+        with self.connection:
+            self._write_result_tables(analysis_id, resultados)
+
+    def _write_result_tables(self, analysis_id, resultados):
+        self.connection.execute("DELETE FROM result_tables WHERE analysis_id = ?", (analysis_id,))
+        for section, contenido in resultados.items():
+            tablas = dict(contenido.get('tablas') or {})
+            if isinstance(contenido.get('estadisticas'), pd.DataFrame):
+                tablas['estadisticas'] = contenido['estadisticas']
+            for name, df in tablas.items():
+                if not isinstance(df, pd.DataFrame):
+                    continue
+                columns = [_column_spec(column, dtype) for column, dtype in df.dtypes.items()]
+                table_id = self.connection.execute(
+                    "INSERT INTO result_tables (analysis_id, section, name, columns, row_count) VALUES (?, ?, ?, ?, ?)",
+                    (analysis_id, section, name, json.dumps(columns, ensure_ascii=False, default=str), len(df))
+                ).lastrowid
+                names = [column[0] for column in columns]
+                values = [_column_values(df.iloc[:, i]) for i in range(df.shape[1])]
+                self.connection.executemany(
+                    "INSERT INTO result_rows (table_id, row_index, data) VALUES (?, ?, ?)",
+                    ((table_id, index, json.dumps(dict(zip(names, row)), ensure_ascii=False, default=str))
+                     for index, row in enumerate(zip(*values)))
+                )
+
+    def fetch_result_tables(self, analysis_id):
+        """Tablas guardadas del análisis con la misma forma que ``resultados``: {seccion: {'tablas': {...}}}.
+
+        Sirve para volver a generar el ZIP o el informe sin repetir el análisis.
+        """
+        with self.connection:
+            tables = self.connection.execute(
+                "SELECT id, section, name, columns FROM result_tables WHERE analysis_id = ? ORDER BY id",
+                (analysis_id,)
+            ).fetchall()
+            resultados = {}
+            for table_id, section, name, columns in tables:
+                rows = self.connection.execute(
+                    "SELECT data FROM result_rows WHERE table_id = ? ORDER BY row_index",
+                    (table_id,)
+                )
+                resultados.setdefault(section, {'tablas': {}})['tablas'][name] = self._build_table(
+                    json.loads(columns), [json.loads(data) for (data,) in rows]
+                )
+            return resultados
+
+    def fetch_result_table_history(self, usuario_id, section, name):
+        """Una tabla de resultados en todos los análisis del usuario, en un único DataFrame.
+
+        Agrega las columnas analysis_id, analysis_name y analysis_date para
+        comparar entre análisis sin abrir los ZIP.
+        """
+        with self.connection:
+            rows = self.connection.execute(
+                "SELECT a.id, a.name, a.date, t.columns, r.data FROM result_tables t "
+                "JOIN analyses a ON a.id = t.analysis_id "
+                "JOIN result_rows r ON r.table_id = t.id "
+                "WHERE a.usuario_id = ? AND t.section = ? AND t.name = ? "
+                "ORDER BY a.date, a.id, r.row_index",
+                (usuario_id, section, name)
+            ).fetchall()
+        if not rows:
+            return pd.DataFrame()
+        # El esquema más reciente manda; columnas que falten en análisis antiguos quedan vacías
+        columns = json.loads(rows[-1][3])
+        data = [dict(json.loads(row_data), analysis_id=analysis_id, analysis_name=analysis_name, analysis_date=date)
+                for analysis_id, analysis_name, date, _, row_data in rows]
+        columns = [["analysis_id", "int64"], ["analysis_name", "object"], ["analysis_date", "object"]] + columns
+        return self._build_table(columns, data)
+
+    @staticmethod
+    def _build_table(columns, rows):
+        return pd.DataFrame({
+            column: _restore_column([row.get(column) for row in rows], dtype, *extra)
+            for column, dtype, *extra in columns
+        })
+
+    # Búsqueda
+    def search(self, usuario_id, text, limit=20, offset=0):
+        """Informes y análisis del usuario que coinciden con ``text``, los más relevantes primero.
+
+        Devuelve filas ``(tipo, id, name, date, fragmento)`` con tipo "report" o
+        "analysis"; el fragmento marca las coincidencias entre corchetes.
+        CROSS JOIN obliga a SQLite a partir del índice FTS y no a recorrer todas
+        las filas del usuario.
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        with self.connection:
+            return self.connection.execute(
+                """
+                SELECT kind, id, name, date, fragment FROM (
+                    SELECT 'report' AS kind, r.id, r.name, r.date,
+                           snippet(reports_fts, -1, '[', ']', '…', 12) AS fragment,
+                           bm25(reports_fts, 10.0, 1.0) AS rank
+                    FROM reports_fts CROSS JOIN reports r ON r.id = reports_fts.rowid
+                    WHERE reports_fts MATCH ?1 AND r.usuario_id = ?2
+                    UNION ALL
+                    SELECT 'analysis', a.id, a.name, a.date,
+                           snippet(analyses_fts, 0, '[', ']', '…', 12),
+                           bm25(analyses_fts)
+                    FROM analyses_fts CROSS JOIN analyses a ON a.id = analyses_fts.rowid
+                    WHERE analyses_fts MATCH ?1 AND a.usuario_id = ?2
+                )
+                ORDER BY rank LIMIT ?3 OFFSET ?4
+                """,
+                (query, usuario_id, limit, offset)
+            ).fetchall()
+
+    def search_reports(self, usuario_id, text, limit=50, offset=0):
+        """Como fetch_reports_metadata, pero sólo los informes que coinciden con ``text``.
+
+        Las palabras se buscan en el índice de texto completo (ordenadas por
+        relevancia) y las fechas ("2025-06", "15/06/2025") filtran por la fecha
+        del informe usando el índice (usuario_id, date).
+        """
+        prefixes, words = date_terms(text)
+        query = fts_query(words)
+        if not query and not prefixes:
+            return []
+        date_filter = "".join(" AND r.date GLOB ?" for _ in prefixes)
+        date_params = [prefix + "*" for prefix in prefixes]
+        with self.connection:
+            if not query:
+                return self.connection.execute(
+                    "SELECT r.id, r.name, r.date, COALESCE(r.artifact_size, length(r.report)) FROM reports r "
+                    f"WHERE r.usuario_id = ?{date_filter} ORDER BY r.date DESC LIMIT ? OFFSET ?",
+                    (usuario_id, *date_params, limit, offset)
+                ).fetchall()
+            return self.connection.execute(
+                "SELECT r.id, r.name, r.date, COALESCE(r.artifact_size, length(r.report)) FROM reports_fts "
+                "CROSS JOIN reports r ON r.id = reports_fts.rowid "
+                f"WHERE reports_fts MATCH ? AND r.usuario_id = ?{date_filter} "
+                "ORDER BY bm25(reports_fts, 10.0, 1.0) LIMIT ? OFFSET ?",
+                (query, usuario_id, *date_params, limit, offset)
+            ).fetchall()
 
     # Reports
     def fetch_reports_by_user(self, usuario_id):
         with self.connection:
             results = self.connection.execute(
-                "SELECT id, name, date, report FROM reports WHERE usuario_id = ? ORDER BY date DESC",
+                "SELECT id, name, date, report, artifact_hash FROM reports WHERE usuario_id = ? ORDER BY date DESC",
                 (usuario_id,)
             ).fetchall()
             # Retornar los resultados directamente sin convertir a bytes
-            return [(id, name, date, report) for id, name, date, report in results]
-    
+            return [(id, name, date, self.artifacts.read_bytes(digest) if digest else report)
+                    for id, name, date, report, digest in results]
+
+    def fetch_reports_metadata(self, usuario_id, limit=None, offset=0):
+        """Lista (id, name, date, size) sin leer los PDF; size es el tamaño en bytes."""
+        with self.connection:
+            return self.connection.execute(
+                "SELECT id, name, date, COALESCE(artifact_size, length(report)) FROM reports WHERE usuario_id = ? "
+                "ORDER BY date DESC LIMIT ? OFFSET ?",
+                (usuario_id, -1 if limit is None else limit, offset)
+            ).fetchall()
+
+    def fetch_report(self, report_id):
+        """(id, name, date, contenido) de un informe; sólo aquí se lee el PDF o el texto."""
+        with self.connection:
+            row = self.connection.execute(
+                "SELECT id, name, date FROM reports WHERE id = ?", (report_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            return (*row, self._read_stored_file("reports", "report", report_id))
+
+    def copy_report_file(self, report_id, destination):
+        with self.connection:
+            return self._copy_stored_file("reports", "report", report_id, destination)
+
     def delete_report_by_id(self, report_id):
         with self.connection:
+            digests = self._artifact_hashes("reports", [report_id])
             self.connection.execute(
                 "DELETE FROM reports WHERE id = ?",
                 (report_id,)
             )
+        self.release_artifacts(digests)
+
+    def _artifact_hashes(self, table, row_ids):
+        row_ids = list(row_ids)
+        placeholders = ", ".join("?" * len(row_ids))
+        return [digest for (digest,) in self.connection.execute(
+            f"SELECT artifact_hash FROM {table} WHERE id IN ({placeholders}) AND artifact_hash IS NOT NULL", row_ids
+        )]
+
+    # Retención
+    def get_retention_policy(self, usuario_id):
+        """``{enabled, keep_last, monthly_after_days}`` del usuario; desactivada si nunca la configuró."""
+        row = self.connection.execute(
+            "SELECT enabled, keep_last, monthly_after_days FROM retention_policies WHERE usuario_id = ?",
+            (usuario_id,)
+        ).fetchone()
+        if row is None:
+            return {"enabled": False, "keep_last": RETENTION_KEEP_LAST,
+                    "monthly_after_days": RETENTION_MONTHLY_AFTER_DAYS}
+        return {"enabled": bool(row[0]), "keep_last": row[1], "monthly_after_days": row[2]}
+
+    def save_retention_policy(self, usuario_id, enabled, keep_last, monthly_after_days):
+        if keep_last < 1 or monthly_after_days < 1:
+            raise ValueError("La retención debe conservar al menos 1 elemento y 1 día")
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO retention_policies (usuario_id, enabled, keep_last, monthly_after_days, updated_at) "
+                "VALUES (?, ?, ?, ?, datetime('now', 'localtime')) "
+                "ON CONFLICT(usuario_id) DO UPDATE SET enabled = excluded.enabled, keep_last = excluded.keep_last, "
+                "monthly_after_days = excluded.monthly_after_days, updated_at = excluded.updated_at",
+                (usuario_id, int(bool(enabled)), keep_last, monthly_after_days)
+            )
+
+    def apply_user_retention(self, usuario_id, dry_run=False, between_batches=None):
+        """Aplica la política guardada del usuario; si no la activó no borra nada y devuelve None."""
+        policy = self.get_retention_policy(usuario_id)
+        if not policy["enabled"]:
+            return None
+        return self.apply_retention(usuario_id, policy["keep_last"], policy["monthly_after_days"],
+                                    between_batches=between_batches, dry_run=dry_run)
+
+    def select_expired(self, table, usuario_id=None, keep_last=RETENTION_KEEP_LAST,
+                       monthly_after_days=RETENTION_MONTHLY_AFTER_DAYS):
+        """Ids de ``table`` (analyses o reports) que la política de retención borraría."""
+        return [row_id for (row_id,) in self.connection.execute(
+            f"""
+            SELECT id FROM (
+                SELECT id, date,
+                       ROW_NUMBER() OVER (PARTITION BY usuario_id ORDER BY date DESC, id DESC) AS recent,
+                       ROW_NUMBER() OVER (PARTITION BY usuario_id, substr(date, 1, 7) ORDER BY date DESC, id DESC) AS in_month
+                FROM {table}
+                WHERE ?1 IS NULL OR usuario_id = ?1
+            )
+            WHERE recent > ?2 AND (date >= datetime('now', 'localtime', ?3) OR in_month > 1)
+            ORDER BY id
+            """,
+            (usuario_id, keep_last, f"-{monthly_after_days} days")
+        )]
+
+    def apply_retention(self, usuario_id=None, keep_last=RETENTION_KEEP_LAST,
+                        monthly_after_days=RETENTION_MONTHLY_AFTER_DAYS, between_batches=None, dry_run=False):
+        """Borra los análisis e informes vencidos por lotes y devuelve el espacio al disco.
+
+        Cada lote es una transacción corta, así que la interfaz puede seguir
+        leyendo entre lotes; ``between_batches()`` se llama después de cada uno
+        (p. ej. para cancelar el trabajo). Devuelve ``{tabla: filas borradas}``;
+        con ``dry_run`` sólo cuenta las que se borrarían.
+        """
+        deleted = {}
+        digests = []
+        for table in ("analyses", "reports"):
+            expired = self.select_expired(table, usuario_id, keep_last, monthly_after_days)
+            if dry_run:
+                deleted[table] = len(expired)
+                continue
+            for start in range(0, len(expired), RETENTION_BATCH_SIZE):
+                batch = expired[start:start + RETENTION_BATCH_SIZE]
+                with self.connection:
+                    digests.extend(self._artifact_hashes(table, batch))
+                    # Las tablas de resultados de los análisis se borran en cascada
+                    self.connection.executemany(f"DELETE FROM {table} WHERE id = ?", ((row_id,) for row_id in batch))
+                if between_batches:
+                    between_batches()
+            deleted[table] = len(expired)
+        if any(deleted.values()) and not dry_run:
+            self.release_artifacts(digests)
+            self.incremental_vacuum(between_batches)
+            print(f"🧹 Retención aplicada: {deleted['analyses']} análisis y {deleted['reports']} informes borrados")
+        return deleted
+
+    def incremental_vacuum(self, between_steps=None):
+        """Devuelve al sistema las páginas libres de a VACUUM_PAGES_PER_STEP, sin un VACUUM bloqueante."""
+        if self.connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        freed = 0
+        free_pages = self.connection.execute("PRAGMA freelist_count").fetchone()[0]
+        while free_pages:
+            self.connection.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})").fetchall()
+            remaining = self.connection.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free_pages:
+                break
+            freed += free_pages - remaining
+            free_pages = remaining
+            if between_steps:
+                between_steps()
+        return freed
+
+    # Exportación / importación del historial
+    def export_user_history(self, usuario_id, destination):
+        """Escribe todos los análisis, informes y tablas de resultados del usuario en un ZIP portable.
+
+        ``destination`` es una ruta o un archivo binario abierto. El ZIP tiene
+        ``manifest.json`` (metadatos), ``results.jsonl`` (una tabla por línea) y
+        ``files/<sha256>`` con cada archivo una sola vez, copiado por bloques.
+        Devuelve el manifiesto.
+        """
+        with self.connection:
+            user = self.connection.execute("SELECT username FROM usuarios WHERE id = ?", (usuario_id,)).fetchone()
+            analyses = self.connection.execute(
+                "SELECT id, name, date, artifact_hash, artifact_size, NULL FROM analyses WHERE usuario_id = ? ORDER BY date, id",
+                (usuario_id,)
+            ).fetchall()
+            reports = self.connection.execute(
+                "SELECT id, name, date, artifact_hash, artifact_size, search_text FROM reports WHERE usuario_id = ? ORDER BY date, id",
+                (usuario_id,)
+            ).fetchall()
+
+        manifest = {
+            "format": HISTORY_FORMAT_VERSION,
+            "exported_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "username": user[0] if user else None,
+            "analyses": [],
+            "reports": [],
+        }
+        written = set()
+        with zipfile.ZipFile(destination, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for key, table, column, rows in (("analyses", "analyses", "file_content", analyses),
+                                             ("reports", "reports", "report", reports)):
+                for row_id, name, date, digest, size, search_text in rows:
+                    digest, size = self._export_file(archive, written, table, column, row_id, digest, size)
+                    item = {"id": row_id, "name": name, "date": date, "file": digest, "size": size}
+                    if search_text is not None:
+                        item["search_text"] = search_text
+                    manifest[key].append(item)
+
+            with archive.open("results.jsonl", "w", force_zip64=True) as results:
+                tables = self.connection.execute(
+                    "SELECT t.id, t.analysis_id, t.section, t.name, t.columns FROM result_tables t "
+                    "JOIN analyses a ON a.id = t.analysis_id WHERE a.usuario_id = ? ORDER BY t.id",
+                    (usuario_id,)
+                ).fetchall()
+                for table_id, analysis_id, section, name, columns in tables:
+                    rows = [data for (data,) in self.connection.execute(
+                        "SELECT data FROM result_rows WHERE table_id = ? ORDER BY row_index", (table_id,)
+                    )]
+                    line = json.dumps({"analysis_id": analysis_id, "section": section, "name": name,
+                                       "columns": json.loads(columns), "rows": rows}, ensure_ascii=False)
+                    results.write(line.encode("utf-8") + b"\n")
+            archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=1),
+                             compress_type=zipfile.ZIP_DEFLATED)
+        print(f"📦 Historial exportado: {len(analyses)} análisis, {len(reports)} informes")
+        return manifest
+
+    def _export_file(self, archive, written, table, column, row_id, digest, size):
+        """Copia al ZIP el archivo de una fila (si no se copió ya) y devuelve ``(sha256, tamaño)``."""
+        if not digest:
+            # Filas antiguas con el archivo dentro de la base: el hash se calcula aquí
+            content = self._read_stored_file(table, column, row_id) or b""
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            digest, size = hashlib.sha256(content).hexdigest(), len(content)
+            if digest not in written:
+                archive.writestr(f"files/{digest}", content)
+        elif digest not in written:
+            with archive.open(f"files/{digest}", "w", force_zip64=True) as entry:
+                self.artifacts.copy_to(digest, entry)
+        written.add(digest)
+        return digest, size
+
+    def import_user_history(self, usuario_id, source):
+        """Carga en ``usuario_id`` un historial creado con export_user_history.
+
+        Los archivos van al almacén de artefactos y todas las filas se insertan
+        con executemany por lotes en una sola transacción. Los análisis e
+        informes que el usuario ya tiene (mismo nombre, fecha y archivo) se
+        omiten, así que importar dos veces el mismo archivo es seguro.
+        Devuelve ``(análisis importados, informes importados)``.
+        """
+        with zipfile.ZipFile(source) as archive:
+            manifest = json.loads(archive.read("manifest.json"))
+            if manifest.get("format") != HISTORY_FORMAT_VERSION:
+                raise ValueError(f"Versión de historial no soportada: {manifest.get('format')}")
+
+            existing = {
+                key: set(self.connection.execute(
+                    f"SELECT name, date, artifact_hash FROM {table} WHERE usuario_id = ?", (usuario_id,)
+                ).fetchall())
+                for key, table in (("analyses", "analyses"), ("reports", "reports"))
+            }
+            pending = {
+                key: [item for item in manifest[key] if (item["name"], item["date"], item["file"]) not in existing[key]]
+                for key in ("analyses", "reports")
+            }
+            stored = set()
+            created = set()
+            for key in ("analyses", "reports"):
+                for item in pending[key]:
+                    if item["file"] not in stored:
+                        if not self.artifacts.exists(item["file"]):
+                            created.add(item["file"])
+                        with archive.open(f"files/{item['file']}") as entry:
+                            digest, _ = self.artifacts.put_file(entry, codec=self._artifact_codec(key))
+                        if digest != item["file"]:
+                            raise ValueError(f"El archivo {item['file'][:12]}… del historial está dañado")
+                        stored.add(digest)
+
+            try:
+                with self.connection:
+                    self.connection.execute("BEGIN IMMEDIATE")
+                    new_ids = {}
+                    first_id = self._next_id("analyses")
+                    for offset, item in enumerate(pending["analyses"]):
+                        new_ids[item["id"]] = first_id + offset
+                    self._insert_batches(
+                        "INSERT INTO analyses (id, usuario_id, name, date, file_content, artifact_hash, artifact_size) "
+                        "VALUES (?, ?, ?, ?, x'', ?, ?)",
+                        [(first_id + offset, usuario_id, item["name"], item["date"], item["file"], item["size"])
+                         for offset, item in enumerate(pending["analyses"])]
+                    )
+                    self._insert_batches(
+                        "INSERT INTO reports (usuario_id, name, date, report, artifact_hash, artifact_size, search_text) "
+                        "VALUES (?, ?, ?, x'', ?, ?, ?)",
+                        [(usuario_id, item["name"], item["date"], item["file"], item["size"], item.get("search_text"))
+                         for item in pending["reports"]]
+                    )
+                    self._import_result_tables(archive, new_ids)
+            except BaseException:
+                # Los archivos que copió esta importación y no quedaron referenciados se borran
+                self.release_artifacts(created, grace_seconds=0)
+                raise
+        imported = (len(pending["analyses"]), len(pending["reports"]))
+        print(f"📥 Historial importado: {imported[0]} análisis, {imported[1]} informes")
+        return imported
+
+    def _next_id(self, table):
+        """Primer id libre de ``table`` (AUTOINCREMENT nunca reutiliza ids)."""
+        row = self.connection.execute(
+            f"SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '{table}'), 0), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 0))"
+        ).fetchone()
+        return row[0] + 1
+
+    def _insert_batches(self, query, rows):
+        for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+            self.connection.executemany(query, rows[start:start + IMPORT_BATCH_SIZE])
+
+    def _import_result_tables(self, archive, new_ids):
+        if not new_ids or "results.jsonl" not in archive.namelist():
+            return
+        table_id = self._next_id("result_tables")
+        tables, rows = [], []
+        with archive.open("results.jsonl") as results:
+            for line in results:
+                table = json.loads(line)
+                analysis_id = new_ids.get(table["analysis_id"])
+                if analysis_id is None:
+                    continue
+                tables.append((table_id, analysis_id, table["section"], table["name"],
+                               json.dumps(table["columns"]), len(table["rows"])))
+                rows.extend((table_id, index, data) for index, data in enumerate(table["rows"]))
+                table_id += 1
+                if len(rows) >= IMPORT_BATCH_SIZE:
+                    self._flush_result_tables(tables, rows)
+        self._flush_result_tables(tables, rows)
+
+    def _flush_result_tables(self, tables, rows):
+        self.connection.executemany(
+            "INSERT INTO result_tables (id, analysis_id, section, name, columns, row_count) VALUES (?, ?, ?, ?, ?, ?)",
+            tables
+        )
+        self.connection.executemany("INSERT INTO result_rows (table_id, row_index, data) VALUES (?, ?, ?)", rows)
+        tables.clear()
+        rows.clear()
 
     def close(self):
-        self.connection.close()
+        self.pool.release()
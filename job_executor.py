@@ -0,0 +1,133 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(BaseException):
+    """Se lanza dentro del trabajo cuando el usuario solicitó la cancelación.
+
+    Hereda de ``BaseException`` para que los ``except Exception`` de los scripts
+    de análisis (que registran y continúan) no la absorban.
+    """
+
+
+class Job:
+    """Trabajo en segundo plano con su cola de eventos y su bandera de cancelación.
+
+    El trabajo nunca toca la interfaz: publica eventos ``(tipo, dato)`` en una
+    ``queue.Queue`` y un hilo despachador los entrega al callback de la vista.
+    """
+
+    ESTADOS_FINALES = ("completado", "error", "cancelado")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.eventos = queue.Queue()
+        self.estado = "pendiente"
+        self.resultado = None
+        self.error = None
+        self.future = None
+        self._cancelado = threading.Event()
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+    @property
+    def activo(self):
+        return self.estado not in self.ESTADOS_FINALES
+
+    def cancelar(self):
+        """Solicita la cancelación; el trabajo se detiene en su próximo punto de control."""
+        self._cancelado.set()
+
+    def verificar_cancelacion(self):
+        if self.cancelado:
+            raise JobCancelled(self.nombre)
+
+    def emitir(self, tipo, dato=None):
+        """Publica un evento para la interfaz. También actúa como punto de cancelación."""
+        self.verificar_cancelacion()
+        self.eventos.put((tipo, dato))
+
+    def progreso(self, etapa=None):
+        """Atajo para usar como ``update_progress`` de los scripts de análisis."""
+        self.emitir("progreso", etapa)
+
+
+class JobExecutor:
+    """Ejecuta trabajos largos (análisis, informes) fuera del hilo de la interfaz Flet."""
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = []
+        self._lock = threading.Lock()
+
+    def submit(self, nombre, funcion, on_event, *args, **kwargs):
+        """Lanza ``funcion(job, *args, **kwargs)`` en un hilo trabajador.
+
+        ``on_event(tipo, dato)`` se invoca desde un hilo despachador por cada
+        evento publicado, terminando con uno de ``Job.ESTADOS_FINALES``.
+        """
+        job = Job(nombre)
+        with self._lock:
+            self._jobs = [j for j in self._jobs if j.activo]
+            self._jobs.append(job)
+        despachador = threading.Thread(target=self._despachar, args=(job, on_event), name=f"job-eventos-{nombre}", daemon=True)
+        despachador.start()
+        job.future = self._pool.submit(self._ejecutar, job, funcion, args, kwargs)
+        return job
+
+    def jobs_activos(self):
+        with self._lock:
+            return [j for j in self._jobs if j.activo]
+
+    def cancelar_todos(self):
+        for job in self.jobs_activos():
+            job.cancelar()
+
+    def shutdown(self):
+        self.cancelar_todos()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _ejecutar(self, job, funcion, args, kwargs):
+        job.estado = "ejecutando"
+        try:
+            job.resultado = funcion(job, *args, **kwargs)
+            job.verificar_cancelacion()
+            job.estado = "completado"
+            job.eventos.put(("completado", job.resultado))
+        except JobCancelled:
+            job.estado = "cancelado"
+            job.eventos.put(("cancelado", None))
+        except Exception as ex:
+            job.error = ex
+            job.estado = "error"
+            job.eventos.put(("error", ex))
+        return job.resultado
+
+    def _despachar(self, job, on_event):
+        while True:
+            tipo, dato = job.eventos.get()
+            # Si ya se pidió cancelar, los eventos intermedios se descartan
+            if job.cancelado and tipo not in Job.ESTADOS_FINALES:
+                continue
+            try:
+                on_event(tipo, dato)
+            except Exception as ex:
+                print(f"❌ Error al procesar evento '{tipo}' del trabajo {job.nombre}: {ex}")
+            if tipo in Job.ESTADOS_FINALES:
+                break
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_job_executor():
+    """Ejecutor compartido por toda la aplicación (se crea la primera vez que se usa)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = JobExecutor()
+        return _executor
@@ -1,6 +1,8 @@
 import flet as ft
+import multiprocessing
 from auth import AuthManager
 from database import DatabaseManager
+from job_executor import get_job_executor
 from views.login_view import LoginView
 from components.header import Header
 from components.sidebar import Sidebar
@@ -10,6 +12,7 @@ from views.analytics import AnalyticsView
 from views.settings import SettingsView
 from views.account import AccountView
 from views.reports import ReportsView
+from scripts.archivo_zip import borrar_zips_huerfanos
 
 
 class MainApp(ft.Container):
@@ -19,6 +22,8 @@ class MainApp(ft.Container):
         self.page.icon = "assets/logo.ico"  # Cambiar el icono de la ventana al iniciar el programa
         self.db_manager = DatabaseManager()
         self.auth_manager = AuthManager(self.db_manager)
+        # Limpieza del almacén en segundo plano: no demora el inicio
+        get_job_executor().submit("mantenimiento", self._mantenimiento_inicio, self._on_mantenimiento_event)
 
         self.user = None  # Para guardar la fila de usuario logueado
 
@@ -49,6 +54,21 @@ class MainApp(ft.Container):
         # Comenzar con login
         self.show_login()
 
+    def _mantenimiento_inicio(self, job):
+        # Archivos de análisis/informes borrados antes de cumplir el período de gracia
+        # y ZIPs de análisis que quedaron de una sesión cerrada a la fuerza
+        return self.db_manager.collect_orphan_artifacts(), borrar_zips_huerfanos()
+
+    def _on_mantenimiento_event(self, tipo, dato):
+        if tipo == "completado":
+            artefactos, zips = dato
+            if artefactos:
+                print(f"🧹 {artefactos} archivos sin uso borrados del almacén")
+            if zips:
+                print(f"🧹 {zips} ZIP de análisis abandonados borrados")
+        elif tipo == "error":
+            print(f"❌ Error en el mantenimiento al iniciar: {dato}")
+
     def show_login(self):
         self.page.title = "Login - Manager Reports App"
         self.page.icon = "assets/logo.ico"  # Cambiar el icono de la ventana
@@ -75,7 +95,7 @@ class MainApp(ft.Container):
             "home": HomeView(self.page, self.bg_color, self.text_color, self.white_color, self.notify_color, self.text_color2, self.notifications_manager, self.user, self.change_view),
             "analytics": AnalyticsView(self.page, self.bg_color, self.text_color, self.white_color, self.notify_color, self.text_color2, self.notifications_manager, self.user),
             "reports": ReportsView(self.page, self.bg_color, self.text_color, self.white_color, self.notify_color, self.text_color2, self.notifications_manager, self.user, self.db_manager),
-            "settings": SettingsView(self.page, self.bg_color, self.text_color, self.white_color, self.notify_color, self.text_color2, self.notifications_manager, self.user),
+            "settings": SettingsView(self.page, self.bg_color, self.text_color, self.white_color, self.notify_color, self.text_color2, self.notifications_manager, self.user, self.db_manager),
             "account": AccountView(self.page, self.bg_color, self.text_color, self.white_color, self.notify_color, self.text_color2, self.notifications_manager, self.user, self.auth_manager, self.on_login_success),
         }
 
@@ -129,4 +149,6 @@ def main(page: ft.Page):
     app = MainApp(page)
 
 if __name__ == "__main__":
+    # Necesario para los procesos de análisis en paralelo en el .exe empaquetado
+    multiprocessing.freeze_support()
     ft.app(target=main)
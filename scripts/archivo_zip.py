@@ -0,0 +1,95 @@
+import glob
+import os
+import tempfile
+import time
+from zipfile import ZipFile
+
+import pandas as pd
+
+from compression import zip_options
+from scripts.exportar_tablas import FORMATOS_TABLAS, escribir_tablas
+
+# ZIPs de resultados: uno por trabajo de análisis, mientras se escribe y hasta
+# que se cierra su ventana (puede haber varios análisis abiertos a la vez)
+DIRECTORIO_ZIP = os.path.join("cache", "zip")
+# Un ZIP de trabajo sin tocar hace más de esto quedó de una sesión que terminó
+# sin cerrar su ventana (p. ej. un cierre forzado) y se borra al iniciar
+ANTIGUEDAD_ZIP_HUERFANO = 24 * 3600
+
+
+def ruta_zip_trabajo():
+    """Crea y devuelve una ruta propia para el ZIP de un trabajo de análisis."""
+    os.makedirs(DIRECTORIO_ZIP, exist_ok=True)
+    fd, ruta = tempfile.mkstemp(prefix="analisis_", suffix=".zip", dir=DIRECTORIO_ZIP)
+    os.close(fd)
+    return ruta
+
+
+def borrar_zip_trabajo(ruta):
+    """Borra el ZIP de un trabajo (sólo ese) si todavía existe."""
+    if not ruta:
+        return
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+    except OSError as ex:
+        # Puede estar abierto (p. ej. en Windows mientras se descarga)
+        print(f"⚠️ No se pudo borrar {ruta}: {ex}")
+
+
+def borrar_zips_huerfanos(antiguedad=ANTIGUEDAD_ZIP_HUERFANO):
+    """Borra los ZIP de trabajo modificados hace más de ``antiguedad`` segundos; devuelve cuántos."""
+    limite = time.time() - antiguedad
+    borrados = 0
+    for ruta in glob.glob(os.path.join(DIRECTORIO_ZIP, "analisis_*.zip")):
+        try:
+            if os.path.getmtime(ruta) >= limite:
+                continue
+        except FileNotFoundError:
+            continue
+        borrar_zip_trabajo(ruta)
+        borrados += not os.path.exists(ruta)
+    return borrados
+
+
+def escribir_analisis(zip_file, nombre_analisis, resultados, formatos_tablas=FORMATOS_TABLAS):
+    """Escribe tablas y gráficos de un análisis en el ZIP abierto, de a un archivo por vez."""
+    tablas = resultados.get('tablas') or {}
+    if 'estadisticas' in resultados and isinstance(resultados['estadisticas'], pd.DataFrame):
+        tablas = {'estadisticas': resultados['estadisticas']}
+    # CSV/XLSX por defecto; PNG sólo si se agrega a FORMATOS_TABLAS. Los gráficos
+    # ya vienen como PNG o SVG según el formato configurado en render_graficos
+    escribir_tablas(zip_file, f"{nombre_analisis}/tablas", tablas, formatos_tablas)
+    for nombre_img, img_bytes in resultados.get('graficos', {}).items():
+        if isinstance(img_bytes, bytes):
+            zip_file.writestr(f"{nombre_analisis}/graficos/{nombre_img}", img_bytes)
+        else:
+            raise TypeError(f"Expected binary data for {nombre_img}, but got {type(img_bytes)}")
+
+
+class EscritorZip:
+    """ZIP de resultados en disco al que se agrega cada análisis apenas termina.
+
+    Tras cada análisis el ZIP se cierra (se escribe su directorio central) y el
+    siguiente se agrega en modo "a": si la aplicación se cierra a mitad de
+    camino, el archivo es un ZIP válido con los análisis ya terminados.
+    """
+
+    def __init__(self, ruta, formatos_tablas=FORMATOS_TABLAS):
+        self.ruta = ruta
+        self.formatos_tablas = formatos_tablas
+        self.analisis = []
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        with ZipFile(ruta, "w", **zip_options()):
+            pass
+
+    def agregar_analisis(self, nombre_analisis, resultados, liberar_graficos=True):
+        """Agrega un análisis al ZIP. Con ``liberar_graficos`` quita los PNG de
+        ``resultados`` una vez escritos, para no retenerlos en memoria."""
+        with ZipFile(self.ruta, "a", **zip_options()) as zip_file:
+            escribir_analisis(zip_file, nombre_analisis, resultados, self.formatos_tablas)
+        if liberar_graficos:
+            resultados.pop('graficos', None)
+        self.analisis.append(nombre_analisis)
+        print(f"🗜️ {nombre_analisis} agregado a {self.ruta}")
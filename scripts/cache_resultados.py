@@ -0,0 +1,137 @@
+import hashlib
+import importlib.util
+import os
+import pickle
+import shutil
+import threading
+from functools import lru_cache
+
+DIRECTORIO_CACHE = os.path.join("cache", "resultados")
+# Espacio máximo en disco; al superarlo se borran los resultados usados hace más tiempo
+LIMITE_CACHE_MB = 512
+
+# Módulos cuyo código determina las tablas, los gráficos y el ZIP de un análisis.
+# Cualquier cambio en ellos invalida los resultados guardados.
+MODULOS_ANALISIS = (
+    "scripts.carga_datos",
+    "scripts.preprocesamiento",
+    "scripts.render_graficos",
+    "scripts.exportar_tablas",
+    "scripts.archivo_zip",
+    "scripts.ejecucion_paralela",
+    "compression",
+    "scripts.analisis_produccion",
+    "scripts.analisis_economico",
+    "scripts.analisis_clinico_gestion",
+    "scripts.analisis_cohortes",
+    "components.popup_analisis",
+)
+# Se usa si no se puede leer el código fuente (p. ej. en el .exe empaquetado)
+VERSION_ANALISIS = "1"
+
+ARCHIVO_RESULTADOS = "resultados.pkl"
+ARCHIVO_ZIP = "resultados.zip"
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def version_codigo():
+    """Huella del código de los análisis: el SHA-256 de sus fuentes."""
+    sha = hashlib.sha256(VERSION_ANALISIS.encode())
+    for modulo in MODULOS_ANALISIS:
+        spec = importlib.util.find_spec(modulo)
+        try:
+            with open(spec.origin, 'rb') as fuente:
+                sha.update(fuente.read())
+        except (AttributeError, TypeError, OSError):
+            return VERSION_ANALISIS
+    return sha.hexdigest()
+
+
+def clave_resultados(huella_archivo, perfil_graficos=None, formato_graficos=None):
+    """Clave del análisis de un archivo: su contenido, la versión del código y
+    el perfil de resolución y el formato de los gráficos."""
+    clave = f"{huella_archivo}_{version_codigo()[:16]}"
+    if perfil_graficos:
+        clave = f"{clave}_{perfil_graficos}"
+    # Los PNG conservan la clave anterior para no invalidar la caché existente
+    if formato_graficos and formato_graficos != 'png':
+        clave = f"{clave}_{formato_graficos}"
+    return clave
+
+
+def leer_resultados(clave, ruta_zip):
+    """Devuelve los resultados guardados con ``clave`` (o ``None``) y copia su ZIP a ``ruta_zip``."""
+    directorio = os.path.join(DIRECTORIO_CACHE, clave)
+    try:
+        with open(os.path.join(directorio, ARCHIVO_RESULTADOS), 'rb') as archivo:
+            resultados = pickle.load(archivo)
+        shutil.copyfile(os.path.join(directorio, ARCHIVO_ZIP), ruta_zip)
+    except FileNotFoundError:
+        return None
+    except Exception as ex:
+        print(f"⚠️ No se pudo leer la caché de resultados {clave}: {ex}")
+        return None
+    # La fecha de modificación marca el último uso para el desalojo
+    os.utime(directorio)
+    print(f"⚡ Resultados recuperados desde caché: {clave}")
+    return resultados
+
+
+def guardar_resultados(clave, resultados, ruta_zip):
+    """Guarda las tablas y una copia del ZIP (``ruta_zip``) de un análisis y desaloja los más antiguos."""
+    directorio = os.path.join(DIRECTORIO_CACHE, clave)
+    temporal = f"{directorio}.tmp{threading.get_ident()}"
+    try:
+        os.makedirs(temporal, exist_ok=True)
+        with open(os.path.join(temporal, ARCHIVO_RESULTADOS), 'wb') as archivo:
+            pickle.dump(resultados, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+        shutil.copyfile(ruta_zip, os.path.join(temporal, ARCHIVO_ZIP))
+        with _lock:
+            shutil.rmtree(directorio, ignore_errors=True)
+            os.replace(temporal, directorio)
+    except Exception as ex:
+        print(f"⚠️ No se guardaron los resultados en caché: {ex}")
+        shutil.rmtree(temporal, ignore_errors=True)
+        return
+    desalojar()
+
+
+def desalojar(limite_mb=LIMITE_CACHE_MB, directorio_cache=DIRECTORIO_CACHE):
+    """Borra las entradas menos usadas de ``directorio_cache`` hasta que quepa en ``limite_mb``.
+
+    Cada entrada es un directorio (resultados) o un archivo (extractos); su
+    fecha de modificación marca el último uso.
+    """
+    with _lock:
+        try:
+            nombres = os.listdir(directorio_cache)
+        except FileNotFoundError:
+            return
+        entradas = []
+        for nombre in nombres:
+            ruta = os.path.join(directorio_cache, nombre)
+            if '.tmp' in nombre:
+                continue
+            if os.path.isdir(ruta):
+                tamano = sum(entrada.stat().st_size for entrada in os.scandir(ruta) if entrada.is_file())
+            else:
+                tamano = os.path.getsize(ruta)
+            entradas.append((os.path.getmtime(ruta), tamano, ruta))
+
+        ocupado = sum(tamano for _, tamano, _ in entradas)
+        limite = limite_mb * 1024 * 1024
+        for _, tamano, ruta in sorted(entradas):
+            if ocupado <= limite:
+                break
+            try:
+                if os.path.isdir(ruta):
+                    shutil.rmtree(ruta)
+                else:
+                    os.remove(ruta)
+            except OSError as ex:
+                print(f"⚠️ No se pudo desalojar {ruta}: {ex}")
+                continue
+            ocupado -= tamano
+            print(f"🧹 Desalojado de la caché: {os.path.basename(ruta)}")
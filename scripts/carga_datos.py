@@ -0,0 +1,341 @@
+import hashlib
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from scripts.cache_resultados import desalojar
+from scripts.preprocesamiento import COLUMNAS_CATEGORICAS, aplicar_esquema
+
+# Columnas que usan los scripts de análisis: se leen sólo éstas
+COLUMNAS_REQUERIDAS = [
+    "Año egreso", "Hospital (Descripción)", "GRD", "Especialidad (Descripción )", "Fecha de egreso completa",
+    "Sexo (Desc)", "Comuna de residencia ( Desc )", "Fecha ingreso completa", "(SI/NO) VMI", "Motivo Egreso (Descripción)",
+    "Prevision (Desc)", "Hospital de procedencia (Des )", "Estancia del Episodio", "(Sí/No) Cancer-Neoplasias",
+    "Tipo Ingreso (Descripción)", "Nivel de severidad (Descripción)", "(S/N) Egreso Quirúrgico", "(Si/No) Cesáreas", "Peso GRD",
+    "CDM (Descripción)", "Mes egreso (Descripción)", "Edad en años", "Diag 01 Principal (cod+des)", "Estancias [Norma]", "Tipo Actividad","Egresos"
+]
+
+# Los extractos traen dos filas de título antes de los encabezados
+FILA_ENCABEZADO = 2
+
+# En el CSV las columnas descriptivas se leen directamente como categorías
+TIPOS_CSV = {columna: 'category' for columna in COLUMNAS_CATEGORICAS}
+
+DIRECTORIO_CACHE = os.path.join("cache", "extractos")
+# Cambiar al modificar las columnas, el esquema o la limpieza para no reutilizar cachés viejos
+VERSION_CACHE = 4
+# Espacio máximo de la caché de extractos; se desalojan los usados hace más tiempo
+LIMITE_CACHE_EXTRACTOS_MB = 2048
+
+# Un Excel se lee completo en memoria; los CSV se leen por bloques y no tienen tope
+TAMANO_MAXIMO_EXCEL_MB = 10
+# Memoria que puede ocupar la ingesta de un CSV (bloque en lectura + extracto tipado acumulado)
+PRESUPUESTO_MEMORIA_MB = 1024
+# Fracción del presupuesto que usa cada bloque de texto leído
+_FRACCION_BLOQUE = 8
+# Un valor de texto en pandas ocupa varias veces lo que ocupa en el archivo
+_FACTOR_TEXTO = 10
+
+_TAMANO_BLOQUE_HASH = 1024 * 1024
+
+# Fila de totales que el exportador agrega al final del extracto
+TEXTO_SUMA_TOTAL = "Suma Total"
+# Filas de la primera ventana revisada desde el final en busca de esa fila
+_VENTANA_SUMA_TOTAL = 64
+
+_presupuesto_mb = PRESUPUESTO_MEMORIA_MB
+
+
+def configurar_memoria(presupuesto_mb):
+    """Fija la memoria máxima (MB) que puede usar la lectura por bloques de un CSV."""
+    global _presupuesto_mb
+    _presupuesto_mb = presupuesto_mb
+
+
+def hash_archivo(path):
+    """SHA-256 del contenido del archivo, leído por bloques."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(_TAMANO_BLOQUE_HASH), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def motor_excel():
+    """``calamine`` (lector en Rust, mucho más rápido) si está instalado; si no, el de pandas."""
+    version_pandas = tuple(int(parte) for parte in pd.__version__.split('.')[:2])
+    if version_pandas >= (2, 2) and importlib.util.find_spec('python_calamine'):
+        return 'calamine'
+    return None
+
+
+def parquet_disponible():
+    return any(importlib.util.find_spec(motor) for motor in ('pyarrow', 'fastparquet'))
+
+
+def verificar_columnas(df):
+    faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas: {', '.join(faltantes)}")
+    return df
+
+
+def cargar_extracto(path, usar_cache=True, huella=None):
+    """Lee y limpia un extracto GRD (.xlsx/.xls/.csv) con sólo las columnas requeridas.
+
+    Devuelve el extracto con el esquema aplicado, los vacíos rellenados hacia
+    adelante, ``Egresos`` numérico y cortado antes de la fila "Suma Total".
+    El resultado se guarda en caché (Parquet) identificado por el hash del archivo,
+    así que volver a analizar el mismo extracto no vuelve a leerlo. ``huella``
+    permite pasar ese hash si ya se calculó.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in ('.xlsx', '.xls', '.csv'):
+        raise ValueError("El archivo debe ser .xlsx o .csv")
+    if extension != '.csv' and os.path.getsize(path) > TAMANO_MAXIMO_EXCEL_MB * 1024 * 1024:
+        raise ValueError(f"El archivo Excel es demasiado grande (máximo {TAMANO_MAXIMO_EXCEL_MB}MB); "
+                         "expórtelo a CSV para procesarlo por bloques")
+
+    base_cache = None
+    if usar_cache:
+        huella = huella or hash_archivo(path)
+        base_cache = os.path.join(DIRECTORIO_CACHE, f"{huella}_v{VERSION_CACHE}")
+        df = leer_cache(base_cache)
+        if df is not None:
+            return df
+
+    if extension == '.csv':
+        df = leer_csv(path)
+    else:
+        df = leer_excel(path)
+    # Sin la fila "Suma Total" las columnas que la compartían con números quedan
+    # en object; se infieren sus tipos para que coincidan con los de la caché
+    df = aplicar_esquema(df.infer_objects())
+
+    if base_cache:
+        guardar_cache(df, base_cache)
+    return df
+
+
+def leer_excel(path):
+    motor = motor_excel()
+    df = pd.read_excel(path, header=FILA_ENCABEZADO, usecols=_columna_requerida, engine=motor)
+    limpieza = LimpiezaExtracto()
+    df = limpieza.procesar(verificar_columnas(df))
+    limpieza.informar()
+    return df
+
+
+def leer_csv(path):
+    """Lee el CSV por bloques limpiando cada uno; nunca tiene el texto completo en memoria.
+
+    El lector C arma las categorías de cada bloque sobre la marcha y los bloques
+    ya tipados se unen al final. Si el extracto tipado no cabe en el presupuesto
+    de memoria se aborta la lectura.
+    """
+    presupuesto = _presupuesto_mb * 1024 * 1024
+    filas_por_bloque = _filas_por_bloque(path, presupuesto // _FRACCION_BLOQUE)
+    limpieza = LimpiezaExtracto()
+    bloques = []
+    ocupado = 0
+    lector = pd.read_csv(path, header=FILA_ENCABEZADO, usecols=_columna_requerida,
+                         dtype=TIPOS_CSV, chunksize=filas_por_bloque)
+    with lector:
+        for bloque in lector:
+            if not bloques:
+                verificar_columnas(bloque)
+            bloque = limpieza.procesar(bloque)
+            bloques.append(bloque)
+            ocupado += bloque.memory_usage(deep=True).sum()
+            if ocupado > presupuesto:
+                raise ValueError(f"El extracto no cabe en el presupuesto de memoria ({_presupuesto_mb} MB)")
+            if limpieza.terminado:
+                break
+    limpieza.informar()
+    return _unir_bloques(bloques)
+
+
+class LimpiezaExtracto:
+    """Limpieza incremental del extracto, bloque a bloque y en orden.
+
+    Rellena vacíos hacia adelante (arrastrando la última fila del bloque anterior),
+    convierte ``Egresos`` a numérico y corta en la fila "Suma Total", acumulando
+    el total de egresos para compararlo con el declarado en esa fila.
+    """
+
+    def __init__(self):
+        self.ultima_fila = None
+        self.total_egresos = 0
+        self.valor_suma_total = None
+        self.terminado = False
+
+    def procesar(self, bloque):
+        bloque = bloque.ffill()  # Llenar valores nulos hacia adelante
+        if self.ultima_fila is not None:
+            bloque = _rellenar_inicio(bloque, self.ultima_fila)
+        if not bloque.empty:
+            self.ultima_fila = bloque.iloc[-1]
+
+        # Convertir columna 'Egresos' a numérico
+        bloque['Egresos'] = pd.to_numeric(bloque['Egresos'], errors='coerce')
+
+        posicion = posicion_suma_total(bloque)
+        if posicion is not None:
+            self.valor_suma_total = bloque['Egresos'].iloc[posicion]
+            # Cortar justo antes de esa fila
+            bloque = bloque.iloc[:posicion]
+            self.terminado = True
+
+        self.total_egresos += bloque['Egresos'].sum()
+        return bloque
+
+    def informar(self):
+        if self.valor_suma_total is None:
+            print("⚠️ No se encontró la fila con 'Suma Total'.")
+            return
+        print(f"📊 Total de pacientes indicado en 'Suma Total': {int(self.valor_suma_total)}")
+        print(f"📥 Total de egresos analizados desde la base: {int(self.total_egresos)}")
+        if int(self.valor_suma_total) != int(self.total_egresos):
+            print("⚠️ ¡CUIDADO! La suma de egresos no coincide con el total declarado.")
+
+
+def posicion_suma_total(df, texto=TEXTO_SUMA_TOTAL):
+    """Posición de la fila "Suma Total" buscando desde el final, o ``None`` si no está.
+
+    Sólo se revisan las columnas de texto (object y categóricas): en las numéricas
+    o de fecha no puede aparecer. La fila de totales está al final del extracto,
+    así que se recorren ventanas desde la cola hacia el inicio, cada una el doble
+    de la anterior, y se detiene en la primera que la contiene.
+
+    Como el extracto se rellena hacia adelante antes de buscar, las filas que
+    siguen a los totales (notas, filtros) heredan el texto: se devuelve la
+    primera fila del bloque contiguo que lo contiene, no la última.
+    """
+    columnas = [df[columna] for columna in df.columns
+                if df[columna].dtype == object or isinstance(df[columna].dtype, pd.CategoricalDtype)]
+    if not columnas or df.empty:
+        return None
+
+    # En las categóricas basta con buscar el texto entre las categorías y comparar códigos
+    codigos_coincidentes = {}
+    for serie in columnas:
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            coincide = serie.cat.categories.astype(str).str.contains(texto, case=False, regex=False)
+            codigos_coincidentes[serie.name] = np.flatnonzero(coincide)
+
+    def coincidencias(inicio, fin):
+        encontrado = np.zeros(fin - inicio, dtype=bool)
+        for serie in columnas:
+            if serie.name in codigos_coincidentes:
+                codigos = codigos_coincidentes[serie.name]
+                if len(codigos):
+                    encontrado |= np.isin(serie.cat.codes.to_numpy()[inicio:fin], codigos)
+            else:
+                tramo = serie.iloc[inicio:fin]
+                encontrado |= tramo.astype(str).str.contains(texto, case=False, regex=False).to_numpy()
+        return encontrado
+
+    fin = len(df)
+    ventana = _VENTANA_SUMA_TOTAL
+    posicion = None
+    while fin > 0:
+        inicio = max(0, fin - ventana)
+        encontrado = coincidencias(inicio, fin)
+        if posicion is None:
+            if not encontrado.any():
+                fin = inicio
+                ventana *= 2
+                continue
+            # Se descarta lo que sigue a la última coincidencia
+            encontrado = encontrado[:int(np.flatnonzero(encontrado)[-1]) + 1]
+        # Retroceder mientras las filas sigan coincidiendo
+        sin_coincidencia = np.flatnonzero(~encontrado)
+        if len(sin_coincidencia):
+            return inicio + int(sin_coincidencia[-1]) + 1
+        posicion = inicio
+        fin = inicio
+        ventana *= 2
+    return posicion
+
+
+def leer_cache(base_cache):
+    for extension, lector in (('.parquet', pd.read_parquet), ('.pkl', pd.read_pickle)):
+        ruta = base_cache + extension
+        if not os.path.exists(ruta):
+            continue
+        try:
+            df = lector(ruta)
+            # La fecha de modificación marca el último uso para el desalojo
+            os.utime(ruta)
+            print(f"⚡ Extracto leído desde caché: {ruta}")
+            return df
+        except Exception as ex:
+            print(f"⚠️ No se pudo leer la caché {ruta}: {ex}")
+    return None
+
+
+def guardar_cache(df, base_cache):
+    """Guarda el extracto en Parquet; si no se puede, en pickle (mismo contenido y tipos).
+
+    ``cargar_extracto`` ya infirió los tipos, así que leer la caché devuelve el
+    mismo DataFrame que una carga sin caché.
+    """
+    os.makedirs(os.path.dirname(base_cache), exist_ok=True)
+    escritores = [('.pkl', df.to_pickle)]
+    if parquet_disponible():
+        # Si aún quedara una columna object con tipos mezclados, Parquet falla y se usa pickle
+        escritores.insert(0, ('.parquet', lambda ruta: df.to_parquet(ruta, index=False)))
+    for extension, escribir in escritores:
+        ruta = base_cache + extension
+        temporal = f"{ruta}.tmp"
+        try:
+            escribir(temporal)
+            os.replace(temporal, ruta)
+            desalojar(LIMITE_CACHE_EXTRACTOS_MB, DIRECTORIO_CACHE)
+            return ruta
+        except Exception as ex:
+            print(f"⚠️ No se guardó la caché del extracto en {extension}: {ex}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+    return None
+
+
+def _columna_requerida(columna):
+    return columna in COLUMNAS_REQUERIDAS
+
+
+def _filas_por_bloque(path, bytes_por_bloque):
+    # Largo medio de línea en el inicio del archivo, escalado a lo que ocupa ya parseada
+    with open(path, 'rb') as archivo:
+        muestra = archivo.read(256 * 1024)
+    lineas = max(muestra.count(b'\n'), 1)
+    bytes_por_fila = max(len(muestra) // lineas, 1) * _FACTOR_TEXTO
+    return max(1_000, bytes_por_bloque // bytes_por_fila)
+
+
+def _rellenar_inicio(bloque, ultima_fila):
+    """Rellena los vacíos iniciales del bloque con la última fila del bloque anterior."""
+    for columna in bloque.columns:
+        valor = ultima_fila.get(columna)
+        serie = bloque[columna]
+        if pd.isna(valor) or not serie.hasnans:
+            continue
+        if isinstance(serie.dtype, pd.CategoricalDtype) and valor not in serie.cat.categories:
+            serie = serie.cat.add_categories([valor])
+        bloque[columna] = serie.fillna(valor)
+    return bloque
+
+
+def _unir_bloques(bloques):
+    """Concatena los bloques conservando las categóricas (con la unión de sus categorías)."""
+    if len(bloques) == 1:
+        return bloques[0]
+    for columna in bloques[0].columns:
+        if isinstance(bloques[0][columna].dtype, pd.CategoricalDtype):
+            categorias = union_categoricals([bloque[columna] for bloque in bloques]).categories
+            for bloque in bloques:
+                bloque[columna] = bloque[columna].cat.set_categories(categorias)
+    return pd.concat(bloques)
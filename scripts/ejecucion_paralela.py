@@ -0,0 +1,183 @@
+import os
+import pickle
+import queue
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, FIRST_EXCEPTION, wait
+from multiprocessing import shared_memory
+
+from scripts import render_graficos
+
+from scripts.analisis_produccion import AnalisisProduccion
+from scripts.analisis_economico import AnalisisEconomico
+from scripts.analisis_clinico_gestion import AnalisisClinicoGestion
+from scripts.analisis_cohortes import AnalisisCohortes
+
+# (clave en resultados, clase de análisis, etiqueta para el progreso)
+ANALISIS = (
+    ("produccion", AnalisisProduccion, "producción"),
+    ("economico", AnalisisEconomico, "económico"),
+    ("clinico", AnalisisClinicoGestion, "clínico"),
+    ("cohortes", AnalisisCohortes, "cohortes"),
+)
+
+_ALINEACION = 64
+
+# Estado de cada proceso trabajador (se fija en _inicializar_proceso)
+_datos_compartidos = None
+_shm_proceso = None
+_cola_progreso = None
+_evento_cancelacion = None
+
+
+class AnalisisCancelado(Exception):
+    """Se lanza en el proceso trabajador cuando el proceso principal pidió cancelar."""
+
+
+def total_pasos():
+    return sum(clase.get_total_steps() for _, clase, _ in ANALISIS)
+
+
+def publicar_datos(datos):
+    """Serializa los datos preparados una sola vez en un bloque de memoria compartida.
+
+    Se usa pickle protocolo 5 con buffers fuera de banda: los arreglos numéricos
+    (y los códigos de las columnas categóricas) se copian tal cual al bloque y
+    los procesos los reconstruyen sin volver a copiarlos. Devuelve el bloque
+    (que el llamador debe cerrar y liberar) y el descriptor para los procesos.
+    """
+    buffers = []
+    cabecera = pickle.dumps(datos, protocol=5, buffer_callback=buffers.append)
+    vistas = [b.raw() for b in buffers]
+
+    segmentos = []
+    offset = _alinear(len(cabecera))
+    for vista in vistas:
+        segmentos.append((offset, vista.nbytes))
+        offset = _alinear(offset + vista.nbytes)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    shm.buf[:len(cabecera)] = cabecera
+    for (inicio, largo), vista in zip(segmentos, vistas):
+        shm.buf[inicio:inicio + largo] = vista.cast("B")
+    return shm, (shm.name, len(cabecera), segmentos)
+
+
+def leer_datos(descriptor):
+    """Reconstruye en un proceso los datos publicados con ``publicar_datos``.
+
+    Los arreglos quedan de sólo lectura: los cuatro análisis leen el mismo bloque.
+    """
+    nombre, largo_cabecera, segmentos = descriptor
+    # Los procesos "spawn" comparten el resource_tracker del principal, que es
+    # quien libera el bloque con unlink() al terminar
+    shm = shared_memory.SharedMemory(name=nombre)
+    vista = shm.buf.toreadonly()
+    buffers = [vista[inicio:inicio + largo] for inicio, largo in segmentos]
+    datos = pickle.loads(vista[:largo_cabecera], buffers=buffers)
+    return shm, datos
+
+
+def ejecutar_en_paralelo(datos, nombre_archivo=None, update_progress=None, verificar_cancelacion=None, max_workers=None,
+                         al_terminar=None, perfil_graficos=None, formato_graficos=None):
+    """Ejecuta los cuatro análisis en paralelo sobre los mismos ``DatosPreparados``.
+
+    ``update_progress(etiqueta)`` se invoca en el proceso que llama por cada paso
+    reportado por los procesos trabajadores; si lanza una excepción (por ejemplo,
+    la cancelación del trabajo) se detienen los procesos y la excepción se propaga.
+    ``al_terminar(clave, resultado)`` se invoca, también en el proceso que llama,
+    apenas termina cada análisis (en el orden en que terminan).
+    ``perfil_graficos`` y ``formato_graficos`` eligen la resolución y el formato de
+    los gráficos (por defecto, los del proceso).
+    Con un solo núcleo disponible se ejecuta de forma secuencial.
+    """
+    if max_workers is None:
+        max_workers = min(len(ANALISIS), os.cpu_count() or 1)
+    if max_workers <= 1:
+        return ejecutar_secuencial(datos, nombre_archivo, update_progress, al_terminar,
+                                   perfil_graficos, formato_graficos)
+
+    ctx = mp.get_context("spawn")
+    cola = ctx.Queue()
+    cancelar = ctx.Event()
+    shm, descriptor = publicar_datos(datos)
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=ctx,
+        initializer=_inicializar_proceso,
+        initargs=(descriptor, cola, cancelar, perfil_graficos or render_graficos.perfil_actual(),
+                  formato_graficos or render_graficos.formato_actual()),
+    )
+    try:
+        futures = {pool.submit(_ejecutar_en_proceso, clave, nombre_archivo): clave for clave, _, _ in ANALISIS}
+        pendientes = set(futures)
+        while pendientes:
+            terminados, pendientes = wait(pendientes, timeout=0.1, return_when=FIRST_EXCEPTION)
+            _vaciar_cola(cola, update_progress)
+            if verificar_cancelacion:
+                verificar_cancelacion()
+            for future in futures:
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+            if al_terminar:
+                for future in terminados:
+                    al_terminar(futures[future], future.result())
+        _vaciar_cola(cola, update_progress)
+        resultados = {futures[f]: f.result() for f in futures}
+        return {clave: resultados[clave] for clave, _, _ in ANALISIS}
+    except BaseException:
+        cancelar.set()
+        raise
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        cola.close()
+        shm.close()
+        shm.unlink()
+
+
+def ejecutar_secuencial(datos, nombre_archivo=None, update_progress=None, al_terminar=None, perfil_graficos=None,
+                        formato_graficos=None):
+    resultados = {}
+    with render_graficos.opciones_graficos(perfil_graficos, formato_graficos):
+        for clave, clase, etiqueta in ANALISIS:
+            progreso = (lambda etiqueta=etiqueta: update_progress(etiqueta)) if update_progress else None
+            resultados[clave] = clase(None, nombre_archivo).ejecutar_analisis(datos, progreso)
+            if al_terminar:
+                al_terminar(clave, resultados[clave])
+    return resultados
+
+
+def _vaciar_cola(cola, update_progress):
+    while True:
+        try:
+            etiqueta = cola.get_nowait()
+        except queue.Empty:
+            return
+        if update_progress:
+            update_progress(etiqueta)
+
+
+def _inicializar_proceso(descriptor, cola, cancelar, perfil_graficos, formato_graficos):
+    global _datos_compartidos, _shm_proceso, _cola_progreso, _evento_cancelacion
+    # El bloque debe seguir abierto mientras vivan los datos que lo referencian
+    _shm_proceso, _datos_compartidos = leer_datos(descriptor)
+    _cola_progreso = cola
+    _evento_cancelacion = cancelar
+    # Los cuatro análisis corren a la vez: cada uno renderiza con su parte de los núcleos
+    render_graficos.configurar_pool(max(1, (os.cpu_count() or 1) // len(ANALISIS)))
+    render_graficos.configurar_perfil(perfil_graficos)
+    render_graficos.configurar_formato(formato_graficos)
+
+
+def _ejecutar_en_proceso(clave, nombre_archivo):
+    clase, etiqueta = next((c, e) for k, c, e in ANALISIS if k == clave)
+
+    def progreso():
+        if _evento_cancelacion.is_set():
+            raise AnalisisCancelado(clave)
+        _cola_progreso.put(etiqueta)
+
+    return clase(None, nombre_archivo).ejecutar_analisis(_datos_compartidos, progreso)
+
+
+def _alinear(offset):
+    return (offset + _ALINEACION - 1) // _ALINEACION * _ALINEACION
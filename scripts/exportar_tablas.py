@@ -0,0 +1,140 @@
+import io
+import re
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from scripts.carga_datos import parquet_disponible
+from scripts.render_graficos import dpi_perfil
+
+# Formatos en que se escriben las tablas de resultados en el ZIP. "xlsx" genera un
+# único libro por análisis (una hoja por tabla); "png" dibuja cada tabla con
+# matplotlib, mucho más lento, y queda sólo para quien lo pida.
+FORMATOS_TABLAS = ("csv", "xlsx")
+FORMATOS_DISPONIBLES = ("csv", "xlsx", "parquet", "html", "png")
+
+_LARGO_HOJA = 31  # Excel no admite nombres de hoja más largos
+
+
+def formatear_tabla(df):
+    """Copia para mostrar: floats con 2 decimales y enteros sin decimales."""
+    df_formateado = df.copy()
+    for col in df_formateado.columns:
+        if pd.api.types.is_float_dtype(df_formateado[col]):
+            df_formateado[col] = df_formateado[col].round(2)
+        elif pd.api.types.is_integer_dtype(df_formateado[col]):
+            df_formateado[col] = df_formateado[col].astype(int)
+    return df_formateado
+
+
+def tabla_csv(df):
+    # utf-8-sig para que Excel muestre bien los acentos al abrir el CSV
+    return formatear_tabla(df).to_csv(index=False).encode('utf-8-sig')
+
+
+def tabla_parquet(df):
+    """Parquet conserva los tipos (categorías, períodos) sin redondear."""
+    buffer = io.BytesIO()
+    df.reset_index(drop=True).to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def tabla_html(df):
+    html = formatear_tabla(df).to_html(index=False, border=0, classes='tabla', na_rep='')
+    return f'<!DOCTYPE html>\n<meta charset="utf-8">\n{html}\n'.encode('utf-8')
+
+
+def tabla_png(df):
+    """La tabla dibujada con matplotlib, como se generaba antes en el ZIP."""
+    df_str = formatear_tabla(df).astype(str)
+    ncols = len(df_str.columns)
+    nrows = len(df_str)
+    fig_width = max(14, ncols * 1.2)
+    fig_height = max(1, min(0.7 * nrows, 40))
+    fig, ax = plt.subplots(figsize=(fig_width, fig_height))
+    ax.axis('off')
+    col_colors = ['#4CAF50'] * ncols
+    table = ax.table(cellText=df_str.values, colLabels=df_str.columns, loc='center', cellLoc='center', colColours=col_colors)
+    for (row, col), cell in table.get_celld().items():
+        cell.set_linewidth(0.5)
+        if row == 0:
+            cell.set_text_props(weight='bold', color='white', fontsize=14)
+            cell.set_facecolor('#4CAF50')
+        else:
+            cell.set_text_props(fontsize=12)
+            cell.set_facecolor('#F5F5F5')
+    table.auto_set_font_size(False)
+    table.scale(1.5, 1.5)
+    try:
+        plt.tight_layout()
+    except Exception:
+        plt.subplots_adjust(left=0.1, right=0.9, top=0.9, bottom=0.1)
+    img_buffer = io.BytesIO()
+    plt.savefig(img_buffer, format='png', dpi=dpi_perfil(), bbox_inches='tight')
+    plt.close(fig)
+    return img_buffer.getvalue()
+
+
+def libro_excel(tablas):
+    """Un .xlsx con una hoja por tabla; los nombres se recortan a 31 caracteres sin repetirse."""
+    buffer = io.BytesIO()
+    usados = set()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for nombre_tabla, df in tablas.items():
+            hoja = _nombre_hoja(nombre_tabla, usados)
+            tabla = formatear_tabla(df)
+            for col in tabla.columns:
+                # Excel no tiene períodos: se escriben como texto (2024-01)
+                if isinstance(tabla[col].dtype, pd.PeriodDtype):
+                    tabla[col] = tabla[col].astype(str)
+            tabla.to_excel(writer, sheet_name=hoja, index=False)
+    return buffer.getvalue()
+
+
+EXPORTADORES = {
+    'csv': tabla_csv,
+    'parquet': tabla_parquet,
+    'html': tabla_html,
+    'png': tabla_png,
+}
+
+
+def formatos_validos(formatos):
+    formatos = tuple(formatos)
+    desconocidos = [formato for formato in formatos if formato not in FORMATOS_DISPONIBLES]
+    if desconocidos:
+        raise ValueError(f"Formatos de tabla desconocidos: {', '.join(desconocidos)}")
+    if 'parquet' in formatos and not parquet_disponible():
+        print("⚠️ pyarrow no está instalado: las tablas no se exportan en Parquet")
+        formatos = tuple(formato for formato in formatos if formato != 'parquet')
+    return formatos
+
+
+def archivos_tabla(nombre_tabla, df, formatos=FORMATOS_TABLAS):
+    """``(nombre de archivo, bytes)`` de una tabla en cada formato individual (todos menos xlsx)."""
+    for formato in formatos:
+        if formato in EXPORTADORES:
+            yield f"{nombre_tabla}.{formato}", EXPORTADORES[formato](df)
+
+
+def escribir_tablas(zip_file, carpeta, tablas, formatos=FORMATOS_TABLAS):
+    """Escribe ``tablas`` ({nombre: DataFrame}) en ``carpeta`` dentro del ZIP abierto."""
+    formatos = formatos_validos(formatos)
+    for nombre_tabla, df in tablas.items():
+        for nombre_archivo, contenido in archivos_tabla(nombre_tabla, df, formatos):
+            zip_file.writestr(f"{carpeta}/{nombre_archivo}", contenido)
+    if 'xlsx' in formatos and tablas:
+        zip_file.writestr(f"{carpeta}/tablas.xlsx", libro_excel(tablas))
+
+
+def _nombre_hoja(nombre, usados):
+    base = re.sub(r'[\[\]:*?/\\]', '_', nombre)[:_LARGO_HOJA]
+    hoja, n = base, 1
+    while hoja.lower() in usados:
+        sufijo = f"_{n}"
+        hoja = base[:_LARGO_HOJA - len(sufijo)] + sufijo
+        n += 1
+    usados.add(hoja.lower())
+    return hoja
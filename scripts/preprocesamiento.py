@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+COLUMNA_FECHA = 'Fecha de egreso completa'
+
+# Columnas descriptivas con pocos valores distintos que se repiten en cada fila
+COLUMNAS_CATEGORICAS = (
+    'Hospital (Descripción)',
+    'Motivo Egreso (Descripción)',
+    'Tipo Ingreso (Descripción)',
+    'Especialidad (Descripción )',
+    'Comuna de residencia ( Desc )',
+    'Diag 01 Principal (cod+des)',
+)
+
+# Mapeo de nombres de hospitales a abreviaturas
+MAPEO_HOSPITALES = {
+    'Hospital Carlos Van Buren (Valparaíso)': 'HCVB',
+    'Hospital Claudio Vicuña ( San Antonio)': 'HCV',
+    'Hospital Dr. Eduardo Pereira Ramírez (Valparaíso)': 'HEP'
+}
+
+# Columnas numéricas que se reducen al tipo más pequeño que conserva sus valores
+COLUMNAS_NUMERICAS = (
+    'Estancia del Episodio',
+    'Peso GRD',
+    'Edad en años',
+)
+
+
+class DatosPreparados:
+    """Extracto de egresos preparado una sola vez y compartido por los cuatro análisis.
+
+    ``df`` tiene la fecha de egreso en datetime, sin filas sin fecha, y las
+    columnas ``Año`` (int) y ``Mes`` ya derivadas. Los análisis no lo modifican:
+    para agregar columnas trabajan sobre un filtro propio o sobre una serie aparte.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._calcular_ventanas()
+
+    def _calcular_ventanas(self):
+        df = self.df
+        if df.empty:
+            self.max_fecha = None
+            self.max_anio = None
+            self.max_mes = None
+            self.anios_comparar = []
+            self.df_filtrado = df
+            self.df_comp = df
+            return
+
+        self.max_fecha = df[COLUMNA_FECHA].max()
+        self.max_anio = self.max_fecha.year
+        self.max_mes = self.max_fecha.month
+        self.anios_comparar = [self.max_anio - 1, self.max_anio]
+        # Años anteriores completos y el último hasta el mes más reciente
+        self.df_filtrado = df[(df['Mes'] <= self.max_mes) | (df['Año'] < self.max_anio)]
+        # Rango de comparación acumulado: mismos meses del último año y del anterior
+        self.df_comp = df[df['Año'].isin(self.anios_comparar) & (df['Mes'] <= self.max_mes)]
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def __getstate__(self):
+        # Al enviarlo a otro proceso sólo viaja el DataFrame; las ventanas se recalculan
+        return {'df': self.df}
+
+    def __setstate__(self, estado):
+        self.df = estado['df']
+        self._calcular_ventanas()
+
+
+def aplicar_esquema(df):
+    """Convierte las columnas descriptivas a ``category`` y reduce las numéricas.
+
+    Se aplica justo después de cargar el archivo e informa la memoria ahorrada.
+    """
+    columnas = [c for c in COLUMNAS_CATEGORICAS + COLUMNAS_NUMERICAS if c in df.columns]
+    antes = df[columnas].memory_usage(deep=True, index=False).sum()
+
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in df.columns and df[columna].dtype == object:
+            df[columna] = df[columna].astype('category')
+
+    for columna in COLUMNAS_NUMERICAS:
+        if columna in df.columns and pd.api.types.is_numeric_dtype(df[columna]):
+            serie = pd.to_numeric(df[columna], downcast='integer')
+            if pd.api.types.is_float_dtype(serie):
+                serie = reducir_float(serie)
+            df[columna] = serie
+
+    despues = df[columnas].memory_usage(deep=True, index=False).sum()
+    if antes:
+        print(f"💾 Memoria de columnas tipadas: {antes / 1024**2:.1f} MB → {despues / 1024**2:.1f} MB "
+              f"(ahorro {100 * (antes - despues) / antes:.0f}%)")
+    return df
+
+
+def reducir_float(serie):
+    """float32 sólo si todos los valores vuelven idénticos a float64; si no, sin cambios.
+
+    Pesos como los de ``Peso GRD`` (4 decimales) no son exactos en float32 y
+    los promedios y sumas se desviarían.
+    """
+    reducida = serie.astype('float32')
+    exacta = (reducida.astype(serie.dtype) == serie) | serie.isna()
+    return reducida if exacta.all() else serie
+
+
+def abreviar_hospitales(serie):
+    """Abreviatura de cada hospital; los que no están en el mapeo conservan su nombre.
+
+    Con una columna categórica el mapeo se aplica a las categorías, no a cada fila.
+    """
+    return serie.map(lambda hospital: MAPEO_HOSPITALES.get(hospital, hospital))
+
+
+def preparar_datos(df):
+    """Parsea la fecha de egreso y deriva ``Año``/``Mes`` con una única copia del DataFrame."""
+    fechas = pd.to_datetime(df[COLUMNA_FECHA], errors='coerce')
+    validas = fechas.notna().to_numpy()
+    # take() devuelve un DataFrame nuevo (sin las filas sin fecha) sobre el que se puede escribir
+    df = df.take(np.flatnonzero(validas))
+    df[COLUMNA_FECHA] = fechas[validas]
+    df['Año'] = df[COLUMNA_FECHA].dt.year.astype(int)
+    df['Mes'] = df[COLUMNA_FECHA].dt.month
+    # Las categorías que sólo aparecían en filas descartadas (sin fecha, "Suma Total") no se muestran
+    for columna in df.columns:
+        if isinstance(df[columna].dtype, pd.CategoricalDtype):
+            df[columna] = df[columna].cat.remove_unused_categories()
+    return DatosPreparados(df)
@@ -0,0 +1,291 @@
+import io
+import os
+import atexit
+import importlib.util
+import threading
+import multiprocessing as mp
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.text import Text
+from matplotlib.transforms import Bbox
+
+# Descripción de un gráfico: ``funcion(fig, ax, datos)`` dibuja sobre una figura
+# (nueva o ya estilada por una llamada anterior a la misma función) usando sólo ``datos`` (ya agregados), por lo que la tarea puede
+# enviarse a otro proceso. ``funcion`` debe estar definida a nivel de módulo.
+# ``dpi`` sólo se indica para forzar una resolución; si es None se usa la del perfil.
+# ``formato`` ("png" o "svg") lo completa renderizar_graficos con el configurado.
+TareaGrafico = namedtuple(
+    'TareaGrafico',
+    ['nombre', 'funcion', 'datos', 'figsize', 'dpi', 'bbox_inches', 'avanza', 'formato'],
+    defaults=(None, None, 'tight', True, None),
+)
+
+# Estilo común de todos los gráficos (antes se aplicaba con plt.style.use dentro de cada script)
+ESTILO = 'seaborn-v0_8' if 'seaborn-v0_8' in plt.style.available else 'ggplot'
+
+# Resolución (dpi) según quién consume los gráficos. En el PDF cada gráfico ocupa
+# 500x200 puntos, así que 150 dpi ya es más de lo que se ve; 300 es para imprimir.
+PERFILES = {
+    'pantalla': 100,
+    'pdf': 150,
+    'impresion': 300,
+}
+PERFIL_POR_DEFECTO = 'pdf'
+
+# "svg" guarda los gráficos como vectores y el informe PDF los incrusta como
+# dibujos de ReportLab (requiere svglib); sin svglib se vuelve a "png".
+FORMATOS = ('png', 'svg')
+FORMATO_POR_DEFECTO = 'png'
+
+_perfil = PERFIL_POR_DEFECTO
+_formato = FORMATO_POR_DEFECTO
+# Opciones elegidas para el trabajo que corre en este hilo (ver ``opciones_graficos``);
+# sin ellas se usan las del proceso
+_opciones_hilo = threading.local()
+# Figuras ya dibujadas y vaciadas, por (función, figsize), para reutilizar sus
+# ejes estilados en el próximo gráfico igual. Son de cada hilo: en el proceso
+# principal pueden renderizar a la vez varios trabajos del JobExecutor.
+_plantillas_hilo = threading.local()
+LIMITE_PLANTILLAS = 64
+# vaciar_figura usa atributos internos de matplotlib: sólo se reutilizan figuras
+# en las versiones en que se verificó que el resultado es idéntico a una nueva
+VERSIONES_PLANTILLAS = ((3, 10), (3, 11))
+REUTILIZAR_FIGURAS = tuple(int(parte) for parte in matplotlib.__version__.split('.')[:2]) in VERSIONES_PLANTILLAS
+_max_workers = None
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configurar_pool(max_workers):
+    """Fija cuántos procesos usa el pool de renderizado (1 = secuencial)."""
+    global _max_workers, _pool
+    with _pool_lock:
+        _max_workers = max_workers
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def configurar_perfil(nombre):
+    """Elige el perfil de resolución de los gráficos de todo el proceso (ver ``PERFILES``)."""
+    global _perfil
+    _perfil = _validar_perfil(nombre)
+
+
+@contextmanager
+def opciones_graficos(perfil=None, formato=None):
+    """Usa ``perfil`` y ``formato`` para los gráficos que se rendericen en este hilo dentro del bloque.
+
+    Es para la ejecución secuencial en el proceso principal, donde varios
+    trabajos del JobExecutor pueden renderizar a la vez con opciones distintas.
+    """
+    anteriores = getattr(_opciones_hilo, 'perfil', None), getattr(_opciones_hilo, 'formato', None)
+    _opciones_hilo.perfil = _validar_perfil(perfil) if perfil else anteriores[0]
+    _opciones_hilo.formato = resolver_formato(formato) if formato else anteriores[1]
+    try:
+        yield
+    finally:
+        _opciones_hilo.perfil, _opciones_hilo.formato = anteriores
+
+
+def perfil_actual():
+    return getattr(_opciones_hilo, 'perfil', None) or _perfil
+
+
+def dpi_perfil(perfil=None):
+    return PERFILES[perfil or perfil_actual()]
+
+
+def _validar_perfil(nombre):
+    if nombre not in PERFILES:
+        raise ValueError(f"Perfil de gráficos desconocido: {nombre}")
+    return nombre
+
+
+def svg_disponible():
+    """True si svglib está instalado para incrustar SVG en el informe."""
+    return importlib.util.find_spec('svglib') is not None
+
+
+def resolver_formato(formato):
+    """Formato que se usará en lugar de ``formato``: "svg" pasa a "png" si falta svglib."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de gráficos desconocido: {formato}")
+    if formato == 'svg' and not svg_disponible():
+        print("⚠️ svglib no está instalado: los gráficos se guardan como PNG")
+        return 'png'
+    return formato
+
+
+def configurar_formato(formato):
+    """Elige el formato de salida de los gráficos de todo el proceso (ver ``FORMATOS``)."""
+    global _formato
+    _formato = resolver_formato(formato)
+
+
+def formato_actual():
+    return getattr(_opciones_hilo, 'formato', None) or _formato
+
+
+def nombre_archivo(tarea):
+    """Nombre del gráfico con la extensión de su formato (las tareas se nombran .png)."""
+    formato = tarea.formato or 'png'
+    return f"{os.path.splitext(tarea.nombre)[0]}.{formato}"
+
+
+def avanzar_al_final(tareas):
+    """Marca sólo la última tarea del grupo para que el bloque cuente como un único paso."""
+    return [tarea._replace(avanza=(i == len(tareas) - 1)) for i, tarea in enumerate(tareas)]
+
+
+def renderizar_grafico(tarea):
+    """Dibuja y serializa (PNG o SVG) una tarea. Se ejecuta en el proceso del pool."""
+    clave = (tarea.funcion, tarea.figsize)
+    plantillas = _plantillas()
+    with plt.style.context(ESTILO):
+        fig = plantillas.pop(clave, None)
+        if fig is None:
+            fig = nueva_figura(tarea.figsize)
+            fig.add_subplot()
+        # Si el gráfico falla la figura se descarta: puede quedar a medio dibujar
+        tarea.funcion(fig, fig.axes[0], tarea.datos)
+        buf = io.BytesIO()
+        fig.savefig(buf, format=tarea.formato or 'png', dpi=tarea.dpi, bbox_inches=tarea.bbox_inches)
+        if not REUTILIZAR_FIGURAS:
+            return buf.getvalue()
+        vaciar_figura(fig)
+    plantillas[clave] = fig
+    while len(plantillas) > LIMITE_PLANTILLAS:
+        plantillas.pop(next(iter(plantillas)))  # La usada hace más tiempo
+    return buf.getvalue()
+
+
+def _plantillas():
+    """Figuras reutilizables del hilo actual."""
+    plantillas = getattr(_plantillas_hilo, 'figuras', None)
+    if plantillas is None:
+        plantillas = _plantillas_hilo.figuras = {}
+    return plantillas
+
+
+def nueva_figura(figsize=None):
+    """Figura con lienzo Agg propio, fuera del estado global de pyplot.
+
+    No hace falta plt.close: no queda registrada en pyplot y se libera al
+    soltarla, y no comparte la "figura actual" con otros hilos que usen pyplot.
+    """
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def vaciar_figura(fig):
+    """Quita lo dibujado en ``fig`` y conserva sus ejes con el estilo ya aplicado.
+
+    Reutilizar los ejes (ticks, spines, grilla) ahorra entre 10% y 20% de cada
+    gráfico frente a crear la figura; vaciarla con clear() no ahorra nada (ver
+    benchmarks/plantillas_graficos.py). El resultado sólo es idéntico si el
+    próximo gráfico lo dibuja la misma función, que vuelve a aplicar su estilo,
+    y con las versiones de matplotlib de VERSIONES_PLANTILLAS.
+    """
+    ax = fig.axes[0]
+    for otro in fig.axes[1:]:  # twinx, barras de color
+        otro.remove()
+    for artista in [*ax.lines, *ax.patches, *ax.texts, *ax.collections, *ax.images, *ax.tables,
+                    *ax.artists, *fig.texts, *fig.legends, *fig.lines, *fig.patches, *fig.images]:
+        artista.remove()
+    if ax.legend_ is not None:
+        ax.legend_.remove()
+    ax.containers.clear()
+    fig._suptitle = None
+    for loc in ('left', 'center', 'right'):
+        ax.set_title('', loc=loc)
+    ax.set_xlabel('')
+    ax.set_ylabel('')
+    # Ejes categóricos (barras por nombre) y límites vuelven a calcularse con los datos nuevos
+    for eje in (ax.xaxis, ax.yaxis):
+        eje._converter = None
+        eje._converter_is_explicit = False
+        eje.units = None
+    ax.dataLim.set(Bbox.null())
+    ax.viewLim.set(Bbox.unit())  # También deshace invert_yaxis
+    ax.ignore_existing_data_limits = True
+    ax.set_autoscale_on(True)
+    ax.set_prop_cycle(None)  # Los colores vuelven a empezar por el primero
+    # Márgenes y posición de una figura nueva (tight_layout y colorbar los cambian)
+    fig.subplots_adjust(**{k: matplotlib.rcParams[f'figure.subplot.{k}']
+                           for k in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+    ax.set_position(ax.get_subplotspec().get_position(fig))
+    # El lienzo y cada texto retienen el renderer Agg (varios MB): se sueltan
+    FigureCanvasAgg(fig)
+    textos = fig.findobj(Text)
+    for eje in (ax.xaxis, ax.yaxis):
+        for tick in eje.majorTicks + eje.minorTicks:
+            textos += [tick.label1, tick.label2]
+    for texto in textos:
+        texto._renderer = None
+
+
+def renderizar_graficos(tareas, update_progress=None):
+    """Renderiza las tareas en paralelo y devuelve ``{nombre: bytes}`` en el orden de ``tareas``.
+
+    Con formato "svg" los nombres terminan en .svg en lugar de .png.
+
+    Un gráfico que falla se informa y se omite, sin detener al resto. Se llama a
+    ``update_progress()`` cada vez que termina una tarea con ``avanza=True``.
+    """
+    # Resolución y formato se fijan aquí: los procesos del pool no conocen los elegidos
+    dpi = dpi_perfil()
+    formato = formato_actual()
+    tareas = [tarea._replace(dpi=tarea.dpi or dpi, formato=tarea.formato or formato) for tarea in tareas]
+    imagenes = {}
+    pool = _obtener_pool() if len(tareas) > 1 else None
+    if pool is None:
+        for tarea in tareas:
+            try:
+                imagenes[tarea.nombre] = renderizar_grafico(tarea)
+            except Exception as ex:
+                print(f"❌ Error generando gráfico {tarea.nombre}: {ex}")
+                continue
+            if update_progress and tarea.avanza:
+                update_progress()
+    else:
+        futures = {pool.submit(renderizar_grafico, tarea): tarea for tarea in tareas}
+        try:
+            for future in as_completed(futures):
+                tarea = futures[future]
+                try:
+                    imagenes[tarea.nombre] = future.result()
+                except Exception as ex:
+                    print(f"❌ Error generando gráfico {tarea.nombre}: {ex}")
+                    continue
+                if update_progress and tarea.avanza:
+                    update_progress()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return {nombre_archivo(tarea): imagenes[tarea.nombre] for tarea in tareas if tarea.nombre in imagenes}
+
+
+def _obtener_pool():
+    global _pool
+    workers = _max_workers if _max_workers is not None else (os.cpu_count() or 1)
+    if workers <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+        return _pool
+
+
+@atexit.register
+def _cerrar_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
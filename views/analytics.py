@@ -10,6 +10,16 @@ from components.notifications import NotificationsManager
 from database import DatabaseManager
 from views import home  # Corrected the import path
 
+HISTORY_PAGE_SIZE = 20  # Análisis por página en el historial
+
+
+def format_size(size):
+    """Tamaño en bytes a texto legible (KB/MB)."""
+    size = size or 0
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / 1024:.0f} KB"
+
 class AnalyticsView(ft.Container):
     def __init__(self, page: ft.Page, bg_color: str, text_color: str, white_color: str, notify_color: str, text_color2: str, notifications_manager: NotificationsManager, user):
         super().__init__(expand=True)
@@ -322,7 +332,8 @@ class AnalyticsView(ft.Container):
         
         # Cargar datos en el hilo principal (evitamos problemas con SQLite)
         try:
-            analyses = self.db_manager.fetch_analyses_by_user(self.user[0])
+            # Sólo id, nombre, fecha y tamaño: el ZIP se lee al descargarlo
+            analyses = self.db_manager.fetch_analyses_metadata(self.user[0], limit=HISTORY_PAGE_SIZE)
             if not analyses:
                 report_list.controls = [
                     ft.Column(
@@ -336,7 +347,7 @@ class AnalyticsView(ft.Container):
                 ]
             else:
                 # Usar ListView para mejor rendimiento
-                list_view = ft.ListView(
+                self.history_list_view = ft.ListView(
                     expand=True,
                     spacing=10,
                     controls=[
@@ -344,7 +355,14 @@ class AnalyticsView(ft.Container):
                         for analysis in analyses
                     ]
                 )
-                report_list.controls = [list_view]
+                self.history_loaded = len(analyses)
+                self.load_more_btn = ft.TextButton(
+                    "Cargar más",
+                    icon=ft.Icons.EXPAND_MORE,
+                    on_click=self.load_more_history,
+                    visible=self.history_loaded < self.db_manager.count_analyses_by_user(self.user[0])
+                )
+                report_list.controls = [self.history_list_view, self.load_more_btn]
         except Exception as e:
             report_list.controls = [
                 ft.Text(f"Error al cargar el historial: {str(e)}", color="red")
@@ -352,11 +370,19 @@ class AnalyticsView(ft.Container):
         
         self.page.update()
         return report_list
+
+    def load_more_history(self, e):
+        """Agrega la siguiente página del historial a la lista."""
+        analyses = self.db_manager.fetch_analyses_metadata(self.user[0], limit=HISTORY_PAGE_SIZE, offset=self.history_loaded)
+        self.history_list_view.controls.extend(
+            self.create_report_item(analysis[1], analysis[2], analysis[3], analysis[0])
+            for analysis in analyses
+        )
+        self.history_loaded += len(analyses)
+        self.load_more_btn.visible = self.history_loaded < self.db_manager.count_analyses_by_user(self.user[0])
+        self.page.update()
     
-    def create_report_item(self, title: str, date: str, file_content: bytes, analysis_id=None):
-            # Asegurarse de que file_content sean los bytes del ZIP, no el ID
-        if not isinstance(file_content, bytes):
-            raise ValueError("file_content debe ser de tipo bytes")
+    def create_report_item(self, title: str, date: str, size: int, analysis_id=None):
         return ft.Card(
             elevation=3,
             content=ft.Container(
@@ -368,7 +394,8 @@ class AnalyticsView(ft.Container):
                             expand=True,
                             controls=[
                                 ft.Text(title, size=16, weight="bold", color=self.white_color),
-                                ft.Text(f"Fecha: {date}", size=12, color=self.white_color)
+                                ft.Text(f"Fecha: {date}", size=12, color=self.white_color),
+                                ft.Text(f"Tamaño: {format_size(size)}", size=12, color=self.white_color)
                             ]
                         ),
                         ft.Row(
@@ -378,7 +405,7 @@ class AnalyticsView(ft.Container):
                                     icon=ft.Icons.DOWNLOAD,
                                     icon_color="#4CAF50",
                                     tooltip="Descargar reporte",
-                                    on_click=lambda e: self.show_download_dialog(title, file_content)
+                                    on_click=lambda e: self.show_download_dialog(title, analysis_id)
                                 ),
                                 ft.IconButton(
                                     icon=ft.Icons.DELETE,
@@ -417,7 +444,7 @@ class AnalyticsView(ft.Container):
         self.delete_dialog.open = True
         self.page.update()
 
-    def show_download_dialog(self, title, file_content):
+    def show_download_dialog(self, title, analysis_id):
         self.download_dialog = ft.AlertDialog(
             modal=True,
             title=ft.Text("Descargar análisis"),
@@ -426,7 +453,7 @@ class AnalyticsView(ft.Container):
                 ft.TextButton("Cancelar", on_click=self.close_dialogs),
                 ft.TextButton(
                     "Descargar", 
-                    on_click=lambda e: self.download_file(file_content, title),
+                    on_click=lambda e: self.download_file(analysis_id, title),
                     style=ft.ButtonStyle(color=ft.Colors.GREEN)
                 ),
             ],
@@ -457,21 +484,22 @@ class AnalyticsView(ft.Container):
             self._show_notification(f"Error al eliminar el análisis: {ex}", is_error=True)
             self.close_dialogs()
 
-    def download_file(self, file_content: bytes, file_name: str):
+    def download_file(self, analysis_id, file_name: str):
         def save_file_result(e: ft.FilePickerResultEvent):
             self.close_dialogs()
 
             if e.path:
                 try:
-                    # Verificar que el contenido no esté vacío
-                    if not file_content or len(file_content) == 0:
-                        raise ValueError("El archivo está vacío")
-                    
                     # Asegurarnos que la extensión sea .zip
                     zip_path = e.path if e.path.endswith('.zip') else f"{e.path}.zip"
 
-                    with open(zip_path, "wb") as f:
-                        f.write(file_content)
+                    # El ZIP se copia de la base al archivo por bloques, recién al descargarlo
+                    copied = self.db_manager.copy_analysis_file(analysis_id, zip_path)
+                    # Verificar que el contenido no esté vacío
+                    if not copied:
+                        if copied == 0:
+                            os.remove(zip_path)
+                        raise ValueError("El archivo está vacío")
                     snackbar = ft.SnackBar(content=ft.Text("Archivo descargado correctamente", color=ft.Colors.WHITE), bgcolor="#4CAF50", behavior=ft.SnackBarBehavior.FLOATING)
                     self.page.overlay.append(snackbar)
                     snackbar.open = True
@@ -400,7 +400,8 @@ class ReportsView(ft.Container):
     
     def _create_analysis_dropdown(self):
         """Create dropdown for analysis selection"""
-        analyses = self.db_manager.fetch_analyses_by_user(self.user[0])
+        # Sólo los metadatos: el ZIP se lee al generar el informe
+        analyses = self.db_manager.fetch_analyses_metadata(self.user[0])
         return ft.Dropdown(
             options=[
                 ft.dropdown.Option(
@@ -418,7 +419,8 @@ class ReportsView(ft.Container):
     
     def _create_reports_list(self):
         """Create list of reports with filtering capability"""
-        reports = self.db_manager.fetch_reports_by_user(self.user[0])
+        # Sólo los metadatos: el PDF se lee al previsualizar o descargar
+        reports = self.db_manager.fetch_reports_metadata(self.user[0])
         if not reports:
             return ft.Container(
                 content=ft.Column(
@@ -450,7 +452,7 @@ class ReportsView(ft.Container):
     
     def _create_report_card(self, report):
         """Create an individual report card for the history list"""
-        report_id, title, content, created_at = report
+        report_id, title, created_at, size = report
         return ft.Card(
             elevation=4,
             shape=ft.RoundedRectangleBorder(radius=10),
@@ -474,7 +476,7 @@ class ReportsView(ft.Container):
                             ]
                         ),
                         ft.Text(
-                            f"{content[:150]}..." if len(content) > 150 else content,
+                            f"{(size or 0) / 1024:.1f} KB",
                             size=14,
                             color=self.text_color2
                         ),
@@ -707,32 +709,31 @@ class ReportsView(ft.Container):
 
     def _filter_reports(self, e):
         """Filter reports based on search input"""
-        search_term = e.control.value.lower()
-        reports = self.db_manager.fetch_reports_by_user(self.user[0])
+        search_term = e.control.value.strip()
         
         if not search_term:
-            self.history_list.controls = [
-                self._create_report_card(report) for report in reports
-            ]
+            reports = self.db_manager.fetch_reports_metadata(self.user[0])
         else:
-            filtered_reports = [
-                report for report in reports 
-                if search_term in report[1].lower() or search_term in report[2].lower()
-            ]
-            self.history_list.controls = [
-                self._create_report_card(report) for report in filtered_reports
-            ]
+            # Índice de texto completo y filtro de fecha en SQL, sin leer los PDF
+            reports = self.db_manager.search_reports(self.user[0], search_term)
+        self.history_list.controls = [
+            self._create_report_card(report) for report in reports
+        ]
         
         self.history_list.update()
     
     def _preview_report(self, report_id):
         """Show a preview of the report in a dialog"""
-        report = self.db_manager.fetch_reports_by_user(report_id)
+        report = self.db_manager.fetch_report(report_id)
         if not report:
             self._show_snackbar("Informe no encontrado", is_error=True)
             return
         
-        _, title, content, _ = report
+        _, title, _, content = report
+        if content.startswith(b"%PDF"):
+            content = "Informe en PDF: usa \"Descargar PDF\" para abrirlo."
+        else:
+            content = content.decode("utf-8", errors="replace")
         
         preview_dialog = ft.AlertDialog(
             title=ft.Text(title),
@@ -819,17 +820,19 @@ class ReportsView(ft.Container):
     
     def download_report(self, report_id):
         """Download report as PDF (simulated)"""
-        report = self.db_manager.fetch_reports_by_user(report_id)
+        report = self.db_manager.fetch_report(report_id)
         if not report:
             self._show_snackbar("Informe no encontrado", is_error=True)
             return
         
-        _, title, content, _ = report
+        _, title, _, content = report
         
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".txt") as tmp:
-                tmp.write(f"Informe: {title}\n\n".encode('utf-8'))
-                tmp.write(content.encode('utf-8'))
+            es_pdf = content.startswith(b"%PDF")
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf" if es_pdf else ".txt") as tmp:
+                if not es_pdf:
+                    tmp.write(f"Informe: {title}\n\n".encode('utf-8'))
+                tmp.write(content)
                 tmp_path = tmp.name
             
             self.page.launch_url(f"file://{tmp_path}")
@@ -1,8 +1,10 @@
 import flet as ft
 from components.notifications import NotificationsManager
+from database import RETENTION_KEEP_LAST, RETENTION_MONTHLY_AFTER_DAYS
+from job_executor import get_job_executor
 
 class SettingsView(ft.Container):
-    def __init__(self, page: ft.Page, bg_color: str, text_color: str, white_color: str, notify_color: str, text_color2: str, notifications_manager: NotificationsManager, user):
+    def __init__(self, page: ft.Page, bg_color: str, text_color: str, white_color: str, notify_color: str, text_color2: str, notifications_manager: NotificationsManager, user, db_manager=None):
         super().__init__(expand=True)
         self.page = page
         self.bg_color = bg_color
@@ -12,6 +14,7 @@ class SettingsView(ft.Container):
         self.text_color2 = text_color2
         self.user = user  # Información del usuario logueado
         self.notifications_manager = notifications_manager  # Almacena el NotificationsManager para usarlo
+        self.db_manager = db_manager
 
         # Widget de configuración
         self.notifications_switch = ft.Switch(value=True, active_color= notify_color)
@@ -37,6 +40,22 @@ class SettingsView(ft.Container):
             thumb_color=white_color
         )
 
+        # Retención del historial: desactivada hasta que el usuario la active
+        politica = db_manager.get_retention_policy(user[0]) if db_manager else {
+            "enabled": False, "keep_last": RETENTION_KEEP_LAST, "monthly_after_days": RETENTION_MONTHLY_AFTER_DAYS}
+        self.retention_switch = ft.Switch(value=politica["enabled"], active_color=notify_color,
+                                          on_change=self._on_retention_change)
+        self.keep_last_field = ft.TextField(value=str(politica["keep_last"]), width=100,
+                                            keyboard_type=ft.KeyboardType.NUMBER, border_color=notify_color)
+        self.monthly_days_field = ft.TextField(value=str(politica["monthly_after_days"]), width=100,
+                                               keyboard_type=ft.KeyboardType.NUMBER, border_color=notify_color)
+        self.retention_text = ft.Text("", size=12, color=text_color)
+        self.apply_retention_btn = ft.OutlinedButton(
+            "Aplicar ahora",
+            disabled=not politica["enabled"],
+            on_click=self._aplicar_retencion,
+        )
+
         self.content = ft.Column(
             scroll = ft.ScrollMode.AUTO,
             expand=True,
@@ -61,6 +80,7 @@ class SettingsView(ft.Container):
                     subtitle="Ajusta el tamaño de la fuente de la aplicación",
                     control=self.font_size_slider
                 ),
+                self._create_retention_settings(),
                 self._create_advanced_settings(),
                 self._create_save_button()
             ]
@@ -110,6 +130,96 @@ class SettingsView(ft.Container):
             )
 
         )
+    def _create_retention_settings(self):
+        return ft.ExpansionTile(
+            title=ft.Text("Retención del historial", color=self.white_color),
+            subtitle=ft.Text("Borrar análisis e informes antiguos (desactivado por defecto)", color=self.text_color),
+            initially_expanded=False,
+            controls=[
+                self._create_setting_card(
+                    icon=ft.Icon(ft.Icons.AUTO_DELETE, color=self.notify_color),
+                    title="Activar retención",
+                    subtitle="Sólo se borra al pulsar \"Aplicar ahora\" con la retención activada y guardada",
+                    control=self.retention_switch
+                ),
+                self._create_setting_card(
+                    icon=ft.Icon(ft.Icons.HISTORY, color=self.notify_color),
+                    title="Conservar siempre los últimos",
+                    subtitle="Cantidad de análisis e informes recientes que nunca se borran",
+                    control=self.keep_last_field
+                ),
+                self._create_setting_card(
+                    icon=ft.Icon(ft.Icons.CALENDAR_MONTH, color=self.notify_color),
+                    title="Uno por mes después de (días)",
+                    subtitle="De los más antiguos que esto queda sólo el último de cada mes",
+                    control=self.monthly_days_field
+                ),
+                ft.Container(
+                    padding=15,
+                    content=ft.Row(
+                        controls=[
+                            ft.OutlinedButton("Vista previa", on_click=self._vista_previa_retencion),
+                            self.apply_retention_btn,
+                            self.retention_text,
+                        ],
+                        spacing=10,
+                    )
+                ),
+            ]
+        )
+
+    def _valores_retencion(self):
+        """``(keep_last, monthly_after_days)`` de los campos, o None si no son enteros positivos."""
+        try:
+            keep_last = int(self.keep_last_field.value)
+            monthly_after_days = int(self.monthly_days_field.value)
+        except (TypeError, ValueError):
+            keep_last = monthly_after_days = 0
+        if keep_last < 1 or monthly_after_days < 1:
+            self.retention_text.value = "Ingresa números enteros mayores que 0"
+            self.page.update()
+            return None
+        return keep_last, monthly_after_days
+
+    def _on_retention_change(self, e):
+        self.apply_retention_btn.disabled = True  # Se habilita al guardar la política activa
+        self.retention_text.value = "Guarda los cambios para aplicar la nueva política"
+        self.page.update()
+
+    def _vista_previa_retencion(self, e):
+        """Cuenta lo que borraría la política de los campos, sin borrar nada."""
+        valores = self._valores_retencion()
+        if valores is None or not self.db_manager:
+            return
+        conteo = self.db_manager.apply_retention(self.user[0], *valores, dry_run=True)
+        self.retention_text.value = (f"Se borrarían {conteo['analyses']} análisis y {conteo['reports']} informes")
+        self.page.update()
+
+    def _aplicar_retencion(self, e):
+        if not self.db_manager:
+            return
+        self.apply_retention_btn.disabled = True
+        self.retention_text.value = "Aplicando retención..."
+        self.page.update()
+        get_job_executor().submit("retencion", self._job_retencion, self._on_retencion_event, self.user[0])
+
+    def _job_retencion(self, job, usuario_id):
+        # Aplica la política guardada (no la de los campos sin guardar)
+        return self.db_manager.apply_user_retention(usuario_id, between_batches=job.verificar_cancelacion)
+
+    def _on_retencion_event(self, tipo, dato):
+        if tipo == "completado":
+            if dato is None:
+                self.retention_text.value = "La retención no está activada"
+            else:
+                self.retention_text.value = f"Se borraron {dato['analyses']} análisis y {dato['reports']} informes"
+        elif tipo == "error":
+            self.retention_text.value = f"No se pudo aplicar la retención: {dato}"
+        elif tipo != "cancelado":
+            return
+        self.apply_retention_btn.disabled = not self.retention_switch.value
+        self.page.update()
+
     def _create_advanced_settings(self):
         return ft.ExpansionTile(
             title=ft.Text("Configuración avanzada", color =self.white_color),
@@ -153,6 +263,13 @@ class SettingsView(ft.Container):
         )
     
     def _save_settings(self):
+        if self.db_manager:
+            valores = self._valores_retencion()
+            if valores is None:
+                return
+            self.db_manager.save_retention_policy(self.user[0], self.retention_switch.value, *valores)
+            self.apply_retention_btn.disabled = not self.retention_switch.value
+            self.retention_text.value = ""
         snackbar = ft.SnackBar(
             content=ft.Text("Cambios guardados correctamente", color=self.white_color),
             bgcolor=self.notify_color,